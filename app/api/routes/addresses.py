@@ -4,7 +4,7 @@ from sqlalchemy import select, update
 
 from app.db.session import get_db
 from app.core.deps import require_user
-from app.models.user import User
+from app.core.auth_cache import Principal
 from app.models.address import UserAddress
 from app.schemas.user import AddressIn, AddressOut
 
@@ -12,7 +12,7 @@ router = APIRouter(prefix="/addresses")
 
 
 @router.get("", response_model=list[AddressOut])
-async def list_addresses(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def list_addresses(user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     res = await db.execute(
         select(UserAddress)
         .where(UserAddress.user_id == int(user.id))
@@ -33,7 +33,7 @@ async def list_addresses(user: User = Depends(require_user), db: AsyncSession =
 
 
 @router.post("", response_model=AddressOut)
-async def create_address(data: AddressIn, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def create_address(data: AddressIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     if data.is_default:
         await db.execute(
             update(UserAddress)
@@ -61,7 +61,7 @@ async def create_address(data: AddressIn, user: User = Depends(require_user), db
 
 
 @router.post("/{address_id}/set-default")
-async def set_default(address_id: int, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def set_default(address_id: int, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     res = await db.execute(
         select(UserAddress).where(UserAddress.id == address_id, UserAddress.user_id == int(user.id))
     )
@@ -3,21 +3,28 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 
 from app.db.session import get_db
+from app.db.replica import get_read_db, replica_health
+from app.db.read import as_float, as_timestamp_text, fetch_dicts, json_or
 from app.core.deps import require_admin
-from app.models.user import User
+from app.core.auth_cache import Principal, publish_user_change
+from app.core.responses import trusted
+from app.core.password_pool import password_pool
 from app.models.dish import Dish, Category
 from app.models.order import Order
 from app.models.review import Review
+from app.models.user import User
+from app.services.catalog_service import publish_catalog_change
+from app.services.dish_meta import compute_highlights
 
 router = APIRouter(prefix="/admin")
 
 @router.get("/categories")
-async def admin_categories(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+async def admin_categories(admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
     res = await db.execute(select(Category).order_by(Category.sort_order.asc(), Category.id.asc()))
     return [{"id": int(c.id), "name": c.name, "sort_order": int(c.sort_order or 0)} for c in res.scalars().all()]
 
 @router.post("/categories")
-async def admin_create_category(payload: dict, admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+async def admin_create_category(payload: dict, admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
     name = str(payload.get("name") or "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="name_required")
@@ -25,25 +32,18 @@ async def admin_create_category(payload: dict, admin: User = Depends(require_adm
     db.add(c)
     await db.commit()
     await db.refresh(c)
+    await publish_catalog_change("category", int(c.id))
     return {"id": int(c.id)}
 
 @router.get("/dishes")
-async def admin_list_dishes(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Dish).order_by(Dish.id.desc()).limit(200))
-    out = []
-    for d in res.scalars().all():
-        out.append({
-            "id": int(d.id),
-            "name": d.name,
-            "price": float(d.price),
-            "status": d.status,
-            "category_id": d.category_id,
-            "ai_metadata": d.ai_metadata or {}
-        })
-    return out
+async def admin_list_dishes(admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    t = Dish.__table__
+    return trusted(await fetch_dicts(db, select(
+        t.c.id, t.c.name, as_float(t.c.price), t.c.status, t.c.category_id, json_or(t.c.ai_metadata, "{}"),
+    ).order_by(t.c.id.desc()).limit(200)))
 
 @router.post("/dishes")
-async def admin_create_dish(payload: dict, admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+async def admin_create_dish(payload: dict, admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
     d = Dish(
         category_id=payload.get("category_id"),
         name=str(payload.get("name") or "").strip(),
@@ -53,15 +53,17 @@ async def admin_create_dish(payload: dict, admin: User = Depends(require_admin),
         status=payload.get("status") or "on_sale",
         ai_metadata=payload.get("ai_metadata") or {}
     )
+    d.ai_highlights = compute_highlights(d.ai_metadata)
     if not d.name or d.price <= 0:
         raise HTTPException(status_code=400, detail="invalid_dish")
     db.add(d)
     await db.commit()
     await db.refresh(d)
+    await publish_catalog_change("dish", int(d.id))
     return {"id": int(d.id)}
 
 @router.put("/dishes/{dish_id}")
-async def admin_update_dish(dish_id: int, payload: dict, admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+async def admin_update_dish(dish_id: int, payload: dict, admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
     res = await db.execute(select(Dish).where(Dish.id == dish_id))
     d = res.scalar_one_or_none()
     if not d:
@@ -76,24 +78,22 @@ async def admin_update_dish(dish_id: int, payload: dict, admin: User = Depends(r
         d.category_id = payload["category_id"]
     if "ai_metadata" in payload:
         d.ai_metadata = payload["ai_metadata"] or {}
+        d.ai_highlights = compute_highlights(d.ai_metadata)
 
     db.add(d)
     await db.commit()
+    await publish_catalog_change("dish", int(dish_id))
     return {"ok": True}
 
 @router.get("/orders")
-async def admin_orders(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Order).order_by(Order.created_at.desc()).limit(200))
-    return [{
-        "id": int(o.id),
-        "user_id": int(o.user_id),
-        "status": o.status,
-        "total_amount": float(o.total_amount),
-        "created_at": str(o.created_at) if o.created_at else None
-    } for o in res.scalars().all()]
+async def admin_orders(admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    t = Order.__table__
+    return trusted(await fetch_dicts(db, select(
+        t.c.id, t.c.user_id, t.c.status, as_float(t.c.total_amount), as_timestamp_text(t.c.created_at),
+    ).order_by(t.c.created_at.desc()).limit(200)))
 
 @router.put("/orders/{order_id}/status")
-async def admin_set_order_status(order_id: int, payload: dict, admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+async def admin_set_order_status(order_id: int, payload: dict, admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
     new_status = str(payload.get("status") or "").strip()
     if new_status not in {"pending","paid","completed","cancelled"}:
         raise HTTPException(status_code=400, detail="invalid_status")
@@ -107,15 +107,32 @@ async def admin_set_order_status(order_id: int, payload: dict, admin: User = Dep
     return {"ok": True}
 
 @router.get("/reviews")
-async def admin_reviews(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Review).order_by(Review.created_at.desc()).limit(200))
-    return [{
-        "id": int(r.id),
-        "user_id": int(r.user_id),
-        "dish_id": int(r.dish_id),
-        "order_id": int(r.order_id),
-        "rating": int(r.rating),
-        "comment": r.comment,
-        "tags": r.tags or [],
-        "created_at": str(r.created_at) if r.created_at else None
-    } for r in res.scalars().all()]
+async def admin_reviews(admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    t = Review.__table__
+    return trusted(await fetch_dicts(db, select(
+        t.c.id, t.c.user_id, t.c.dish_id, t.c.order_id, t.c.rating, t.c.comment,
+        json_or(t.c.tags, "[]"), as_timestamp_text(t.c.created_at),
+    ).order_by(t.c.created_at.desc()).limit(200)))
+
+@router.put("/users/{user_id}/role")
+async def admin_set_user_role(user_id: int, payload: dict, admin: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    new_role = str(payload.get("role") or "").strip()
+    if new_role not in {"user", "admin"}:
+        raise HTTPException(status_code=400, detail="invalid_role")
+    res = await db.execute(update(User).where(User.id == user_id).values(role=new_role).returning(User.id))
+    if res.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="user_not_found")
+    await db.commit()
+    # 鉴权缓存里该用户的旧角色立即作废（所有 worker）
+    await publish_user_change(user_id)
+    return {"ok": True}
+
+@router.get("/metrics/password-pool")
+async def admin_password_pool_metrics(admin: Principal = Depends(require_admin)):
+    # 本 worker 的口令哈希进程池状态（多 worker 部署时各自独立）
+    return password_pool.metrics()
+
+@router.get("/metrics/replica")
+async def admin_replica_status(admin: Principal = Depends(require_admin)):
+    # 本 worker 视角的只读副本状态（是否熔断、最近一次测得的复制延迟）
+    return replica_health.status()
@@ -4,19 +4,29 @@ from sqlalchemy import select
 
 from app.db.session import get_db
 from app.models.user import User
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.password_pool import PasswordPoolBusy, hash_password_async, verify_password_async
+from app.core.security import create_access_token
 from app.schemas.auth import RegisterIn, LoginIn, TokenOut
 
 router = APIRouter(prefix="/auth")
 
 
+def _busy() -> HTTPException:
+    # 口令哈希进程池排队已满：让客户端稍后重试，而不是把事件循环拖死
+    return HTTPException(status_code=503, detail="auth_busy", headers={"Retry-After": "1"})
+
+
 @router.post("/register", response_model=TokenOut)
 async def register(data: RegisterIn, db: AsyncSession = Depends(get_db)):
     exist = await db.execute(select(User).where(User.username == data.username))
     if exist.scalar_one_or_none():
         raise HTTPException(status_code=409, detail="username_taken")
 
-    u = User(username=data.username, password_hash=hash_password(data.password), phone=data.phone, role="user")
+    try:
+        password_hash = await hash_password_async(data.password)
+    except PasswordPoolBusy:
+        raise _busy()
+    u = User(username=data.username, password_hash=password_hash, phone=data.phone, role="user")
     db.add(u)
     await db.commit()
     await db.refresh(u)
@@ -27,9 +37,13 @@ async def register(data: RegisterIn, db: AsyncSession = Depends(get_db)):
 
 @router.post("/login", response_model=TokenOut)
 async def login(data: LoginIn, db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(User).where(User.username == data.username))
-    u = res.scalar_one_or_none()
-    if not u or not verify_password(data.password, u.password_hash):
+    res = await db.execute(select(User.id, User.password_hash).where(User.username == data.username))
+    u = res.one_or_none()
+    try:
+        ok = bool(u) and await verify_password_async(data.password, u.password_hash)
+    except PasswordPoolBusy:
+        raise _busy()
+    if not ok:
         raise HTTPException(status_code=401, detail="invalid_credentials")
 
     token = create_access_token(int(u.id))
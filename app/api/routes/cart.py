@@ -1,21 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.core.deps import require_user
-from app.models.user import User
-from app.schemas.cart import CartOut, CartItemIn, CartItemUpdateIn
-from app.services.cart_service import get_cart_view, add_to_cart, update_cart_item, delete_cart_item
+from app.core.auth_cache import Principal
+from app.core.http_cache import etag_matches
+from app.core.responses import trusted
+from app.schemas.cart import CartOut, CartItemIn, CartItemUpdateIn, CartPatchIn
+from app.services.cart_service import get_cart_view, get_cart_version, add_to_cart, update_cart_item, delete_cart_item, apply_cart_ops
+from app.services.catalog_service import get_catalog
 
 router = APIRouter(prefix="/cart")
 
+# 购物车视图的 ETag = 用户 + 购物车版本 + 菜单快照指纹（菜价/在售状态/规格变化同样会改变视图）
+_CART_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+def _cart_etag(user_id: int, version: int, catalog_etag: str) -> str:
+    return f"cart-{user_id}.{version}-{catalog_etag}"
+
+async def _cart_response(db: AsyncSession, user_id: int) -> Response:
+    snap = await get_catalog(db)
+    items, total, version = await get_cart_view(db, user_id)
+    etag = _cart_etag(user_id, version, snap.etag)
+    return trusted(
+        CartOut(items=items, total_amount=total, version=version),
+        headers={**_CART_CACHE_HEADERS, "ETag": f'"{etag}"'},
+    )
+
 @router.get("", response_model=CartOut)
-async def get_cart(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
-    items, total = await get_cart_view(db, int(user.id))
-    return CartOut(items=items, total_amount=total)
+async def get_cart(request: Request, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
+    # 带 If-None-Match 时先只查版本号（按 user_id 唯一索引），未变化直接 304，不做联表
+    if request.headers.get("if-none-match"):
+        snap = await get_catalog(db)
+        etag = _cart_etag(int(user.id), await get_cart_version(db, int(user.id)), snap.etag)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={**_CART_CACHE_HEADERS, "ETag": f'"{etag}"'})
+    return await _cart_response(db, int(user.id))
+
+@router.patch("", response_model=CartOut)
+async def patch_cart(payload: CartPatchIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
+    # 批量写购物车：一个事务、每类操作一条语句，返回新的购物车视图（数量步进、清空购物车都只需一次请求）
+    try:
+        await apply_cart_ops(db, int(user.id), [op.model_dump() for op in payload.ops], payload.version)
+    except ValueError as e:
+        code = str(e)
+        raise HTTPException(status_code=409 if code == "cart_version_conflict" else 404 if "not_found" in code else 400, detail=code)
+    return await _cart_response(db, int(user.id))
 
 @router.post("/items")
-async def add_item(payload: CartItemIn, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def add_item(payload: CartItemIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         await add_to_cart(db, int(user.id), payload.dish_id, payload.quantity, payload.selected_specs)
     except ValueError as e:
@@ -23,7 +56,7 @@ async def add_item(payload: CartItemIn, user: User = Depends(require_user), db:
     return {"ok": True}
 
 @router.put("/items/{item_id}")
-async def update_item(item_id: int, payload: CartItemUpdateIn, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def update_item(item_id: int, payload: CartItemUpdateIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         await update_cart_item(db, int(user.id), item_id, payload.quantity, payload.selected_specs)
     except ValueError as e:
@@ -31,7 +64,7 @@ async def update_item(item_id: int, payload: CartItemUpdateIn, user: User = Depe
     return {"ok": True}
 
 @router.delete("/items/{item_id}")
-async def delete_item(item_id: int, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def delete_item(item_id: int, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         await delete_cart_item(db, int(user.id), item_id)
     except ValueError as e:
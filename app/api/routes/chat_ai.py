@@ -4,9 +4,9 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.db.session import get_db
+from app.db.session import get_db, release_connection
 from app.core.deps import require_user
-from app.models.user import User
+from app.core.auth_cache import Principal
 from app.models.chat import ChatSession, ChatMessage
 from app.models.user_preferences import UserPreferences
 from app.services.ai.recommender import AiRecommender
@@ -17,7 +17,7 @@ router = APIRouter(prefix="/ai")
 recommender = AiRecommender()
 
 @router.post("/sessions")
-async def create_session(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def create_session(user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     s = ChatSession(user_id=int(user.id), summary=None)
     db.add(s)
     await db.commit()
@@ -25,7 +25,7 @@ async def create_session(user: User = Depends(require_user), db: AsyncSession =
     return {"session_id": int(s.id)}
 
 @router.post("/sessions/{session_id}/messages", response_model=AiResponse)
-async def send_message(session_id: int, payload: dict, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def send_message(session_id: int, payload: dict, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     content = str(payload.get("content") or "").strip()
     if not content:
         raise HTTPException(status_code=400, detail="empty_content")
@@ -49,13 +49,18 @@ async def send_message(session_id: int, payload: dict, user: User = Depends(requ
     await db.commit()
 
     # 候选集（在售 + 关键词/热销/评分 + 忌口过滤）
-    candidates = await build_ai_candidates(db, content, list(pref.dietary_restrictions or []), limit=30)
+    user_tags = list(pref.explicit_tags or [])
+    dietary_restrictions = list(pref.dietary_restrictions or [])
+    implicit_profile = dict(pref.implicit_profile or {})
+    candidates = await build_ai_candidates(db, content, dietary_restrictions, limit=30)
+    # 大模型调用可能要数秒：先把连接还给池，写 assistant message 时再取（释放后 pref 已过期，用上面取出的值）
+    await release_connection(db)
 
     # 推荐（严格候选）
     ai_resp, meta = await recommender.recommend(
-        user_tags=list(pref.explicit_tags or []),
-        dietary_restrictions=list(pref.dietary_restrictions or []),
-        implicit_profile=dict(pref.implicit_profile or {}),
+        user_tags=user_tags,
+        dietary_restrictions=dietary_restrictions,
+        implicit_profile=implicit_profile,
         user_query=content,
         candidates=candidates
     )
@@ -74,7 +79,7 @@ async def send_message(session_id: int, payload: dict, user: User = Depends(requ
     return ai_resp
 
 @router.post("/sessions/{session_id}/messages:stream")
-async def send_message_stream(session_id: int, payload: dict, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def send_message_stream(session_id: int, payload: dict, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     content = str(payload.get("content") or "").strip()
     if not content:
         raise HTTPException(status_code=400, detail="empty_content")
@@ -94,11 +99,15 @@ async def send_message_stream(session_id: int, payload: dict, user: User = Depen
     db.add(ChatMessage(session_id=session_id, role="user", content=content))
     await db.commit()
 
-    candidates = await build_ai_candidates(db, content, list(pref.dietary_restrictions or []), limit=30)
+    user_tags = list(pref.explicit_tags or [])
+    dietary_restrictions = list(pref.dietary_restrictions or [])
+    implicit_profile = dict(pref.implicit_profile or {})
+    candidates = await build_ai_candidates(db, content, dietary_restrictions, limit=30)
+    await release_connection(db)
     ai_resp, meta = await recommender.recommend(
-        user_tags=list(pref.explicit_tags or []),
-        dietary_restrictions=list(pref.dietary_restrictions or []),
-        implicit_profile=dict(pref.implicit_profile or {}),
+        user_tags=user_tags,
+        dietary_restrictions=dietary_restrictions,
+        implicit_profile=implicit_profile,
         user_query=content,
         candidates=candidates
     )
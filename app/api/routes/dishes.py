@@ -1,49 +1,103 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from app.db.session import get_db
+from app.db.replica import get_read_db
 from app.core.deps import require_user
-from app.models.user import User
-from app.models.dish import Category
-from app.schemas.dish import CategoryOut, DishListOut, DishListItem, DishDetailOut, DishSpecOut
-from app.services.dish_service import list_dishes, get_dish_detail, recommend_home, compute_highlights
+from app.core.http_cache import cached_json
+from app.core.responses import trusted
+from app.core.auth_cache import Principal
+from app.schemas.dish import CategoryOut, DishBatchIn, DishBatchOut, DishListOut, DishListItem, DishDetailOut, DishSpecOut, DishSuggestionOut
+from app.services.dish_service import DISH_LIST_LIMIT_DEFAULT, DISH_LIST_LIMIT_MAX, is_live_query, list_dishes, get_dish_details
+from app.services.home_feed import home_feed_cache
+from app.services.catalog_service import get_catalog
 
 router = APIRouter(prefix="/dishes")
 
+# 目录类 GET 接口：ETag 取自菜单快照指纹，If-None-Match 命中返回 304；未命中复用已序列化的字节
+# 只有响应完全由快照构造时才能这样缓存；读库内实时行（可能来自副本）的响应不带 ETag、不进字节缓存
+
 @router.get("/categories", response_model=list[CategoryOut])
-async def categories(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Category).order_by(Category.sort_order.asc(), Category.id.asc()))
-    return [CategoryOut(id=int(c.id), name=c.name, sort_order=int(c.sort_order or 0)) for c in res.scalars().all()]
+async def categories(request: Request, db: AsyncSession = Depends(get_read_db)):
+    snap = await get_catalog(db)
+
+    async def build():
+        return [CategoryOut(id=c.id, name=c.name, sort_order=c.sort_order) for c in snap.categories]
+
+    return await cached_json(request, snap.etag, build)
 
 @router.get("", response_model=DishListOut)
 async def dishes(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     category_id: int | None = Query(default=None),
     keyword: str | None = Query(default=None),
     status: str = Query(default="on_sale"),
+    sort: Literal["relevance", "id", "sales", "rating", "price"] | None = Query(default=None),
+    limit: int = Query(default=DISH_LIST_LIMIT_DEFAULT, ge=1, le=DISH_LIST_LIMIT_MAX),
+    cursor: str | None = Query(default=None),
+    include_total: bool = Query(default=False),
+    mode: Literal["bm25", "fuzzy"] = Query(default="bm25"),
 ):
-    items = await list_dishes(db, category_id=category_id, keyword=keyword, status=status)
-    out = []
-    for d in items:
-        out.append(DishListItem(
-            id=int(d.id),
-            name=d.name,
-            price=float(d.price),
-            image_url=d.image_url,
-            status=d.status,
-            rating_avg=float(d.rating_avg),
-            rating_count=int(d.rating_count),
-            sales_count=int(d.sales_count),
-            ai_highlights=compute_highlights(d.ai_metadata or {})
-        ))
-    return DishListOut(items=out, total=len(out))
+    # 分页：keyset（排序键, id）；sort 缺省时关键词检索按相关度、否则按 id
+    # mode=fuzzy：关键词检索下推到 Postgres 三元组索引，按相似度排序、容错别字（实时行，不缓存）
+    # 快照路径只取一次快照：ETag 与响应体出自同一份，中途换代也不会把新数据挂在旧 ETag 下
+    live = is_live_query(keyword, mode)
+    snap = None if live else await get_catalog(db)
+
+    async def build():
+        try:
+            items, next_cursor, total = await list_dishes(
+                db, category_id=category_id, keyword=keyword, status=status,
+                sort=sort, limit=limit, cursor=cursor, include_total=include_total, mode=mode, snap=snap,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        out = []
+        for d in items:
+            out.append(DishListItem(
+                id=int(d.id),
+                name=d.name,
+                price=float(d.price),
+                image_url=d.image_url,
+                status=d.status,
+                rating_avg=float(d.rating_avg),
+                rating_count=int(d.rating_count),
+                sales_count=int(d.sales_count),
+                ai_highlights=list(d.ai_highlights or [])
+            ))
+        return DishListOut(items=out, total=total, next_cursor=next_cursor)
+
+    if live:
+        return trusted(await build())
+    return await cached_json(request, snap.etag, build)
+
+@router.get("/suggest", response_model=list[DishSuggestionOut])
+async def suggest(
+    prefix: str = Query(default="", max_length=50),
+    limit: int = Query(default=8, ge=1, le=10),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # 输入联想：进程内前缀 trie（菜名/拼音首字母/分类名，按销量加权），快照新鲜时不查库
+    # 注意：必须注册在 /{dish_id} 之前
+    snap = await get_catalog(db)
+    return trusted([{"kind": kind, "id": entry_id, "text": text} for kind, entry_id, text, _ in snap.suggest.suggest(prefix, limit)])
 
 @router.get("/{dish_id}", response_model=DishDetailOut)
-async def dish_detail(dish_id: int, db: AsyncSession = Depends(get_db)):
-    dish, specs = await get_dish_detail(db, dish_id)
-    if not dish:
-        raise HTTPException(status_code=404, detail="dish_not_found")
+async def dish_detail(dish_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    # 详情直接取自快照（含非在售菜与规格），响应与 ETag 出自同一份数据
+    snap = await get_catalog(db)
+
+    async def build():
+        dish = snap.dishes.get(dish_id)
+        if dish is None:
+            raise HTTPException(status_code=404, detail="dish_not_found")
+        return _detail_out(dish, snap.specs.get(dish_id, []))
+
+    return await cached_json(request, snap.etag, build)
+
+def _detail_out(dish, specs) -> DishDetailOut:
     return DishDetailOut(
         id=int(dish.id),
         category_id=int(dish.category_id) if dish.category_id is not None else None,
@@ -59,12 +113,19 @@ async def dish_detail(dish_id: int, db: AsyncSession = Depends(get_db)):
         specs=[DishSpecOut(id=int(s.id), spec_name=s.spec_name, spec_values=s.spec_values or []) for s in specs]
     )
 
+@router.post(":batch", response_model=DishBatchOut)
+async def dish_batch(payload: DishBatchIn, db: AsyncSession = Depends(get_read_db)):
+    # 购物车/结算/订单详情一次取多道菜：固定两次查询（菜品 IN + 规格 IN），结果按请求顺序
+    dishes, specs = await get_dish_details(db, payload.ids)
+    found = {int(d.id) for d in dishes}
+    missing = [i for i in dict.fromkeys(payload.ids) if i not in found]
+    return trusted(DishBatchOut(items=[_detail_out(d, specs.get(int(d.id), [])) for d in dishes], missing=missing))
+
 @router.get("/recommend/home", response_model=DishListOut)
-async def home_recommend(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def home_recommend(user: Principal = Depends(require_user), db: AsyncSession = Depends(get_read_db)):
     # 固定决策：使用用户 tags 做轻量个性化
-    # tags 从 preferences 读在 users/preferences 接口，前端也可缓存；这里不再 join，保持接口快
-    # 一期：直接热销/高评分推荐，个性化在前端更精细也可；这里提供基础版
-    dishes = await recommend_home(db, user_tags=[])
+    # 用户标签与（标签组合, 餐段）排序结果都在进程内缓存，命中时不查库
+    dishes = await home_feed_cache.get(db, int(user.id))
     out = []
     for d in dishes:
         out.append(DishListItem(
@@ -76,6 +137,6 @@ async def home_recommend(user: User = Depends(require_user), db: AsyncSession =
             rating_avg=float(d.rating_avg),
             rating_count=int(d.rating_count),
             sales_count=int(d.sales_count),
-            ai_highlights=compute_highlights(d.ai_metadata or {})
+            ai_highlights=list(d.ai_highlights or [])
         ))
-    return DishListOut(items=out, total=len(out))
+    return trusted(DishListOut(items=out, total=len(out)))
@@ -3,16 +3,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.db.session import get_db
+from app.db.replica import get_read_db
+from app.db.read import as_float, as_timestamp_text, fetch_dicts, fetch_scalar
 from app.core.deps import require_user
-from app.models.user import User
+from app.core.auth_cache import Principal
+from app.core.responses import trusted
 from app.models.order import Order, OrderItem
-from app.schemas.order import OrderCreateIn, OrderCreateOut, OrderListOut, OrderListItem, OrderDetailOut, OrderItemOut
-from app.services.order_service import create_order, set_order_status
+from app.schemas.order import OrderCreateIn, OrderFromCartIn, OrderCreateOut, OrderListOut, OrderDetailOut, OrderItemOut
+from app.services.order_service import create_order, create_order_from_cart, set_order_status
 
 router = APIRouter(prefix="/orders")
 
 @router.post("", response_model=OrderCreateOut)
-async def create(payload: OrderCreateIn, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def create(payload: OrderCreateIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         order = await create_order(
             db=db,
@@ -25,29 +28,33 @@ async def create(payload: OrderCreateIn, user: User = Depends(require_user), db:
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("", response_model=OrderListOut)
-async def list_orders(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
-    total_res = await db.execute(select(func.count()).select_from(Order).where(Order.user_id == int(user.id)))
-    total = int(total_res.scalar() or 0)
+@router.post(":from-cart", response_model=OrderCreateOut)
+async def create_from_cart(payload: OrderFromCartIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
+    # 服务端按购物车结算：锁购物车 → 定价（含规格加价）→ 批量写订单与明细 → 清空购物车，一个事务完成
+    try:
+        order = await create_order_from_cart(
+            db=db,
+            user_id=int(user.id),
+            address_id=payload.address_id,
+            note=payload.note,
+            cart_version=payload.cart_version,
+        )
+    except ValueError as e:
+        code = str(e)
+        raise HTTPException(status_code=409 if code == "cart_version_conflict" else 400, detail=code)
+    return OrderCreateOut(order_id=int(order.id), status=order.status, total_amount=float(order.total_amount))
 
-    res = await db.execute(
-        select(Order)
-        .where(Order.user_id == int(user.id))
-        .order_by(Order.created_at.desc())
-        .limit(50)
-    )
-    items = []
-    for o in res.scalars().all():
-        items.append(OrderListItem(
-            id=int(o.id),
-            status=o.status,
-            total_amount=float(o.total_amount),
-            created_at=str(o.created_at) if o.created_at else None
-        ))
-    return OrderListOut(items=items, total=total)
+@router.get("", response_model=OrderListOut)
+async def list_orders(user: Principal = Depends(require_user), db: AsyncSession = Depends(get_read_db)):
+    t = Order.__table__
+    total = int(await fetch_scalar(db, select(func.count()).select_from(t).where(t.c.user_id == int(user.id))) or 0)
+    items = await fetch_dicts(db, select(
+        t.c.id, t.c.status, as_float(t.c.total_amount), as_timestamp_text(t.c.created_at),
+    ).where(t.c.user_id == int(user.id)).order_by(t.c.created_at.desc()).limit(50))
+    return trusted({"items": items, "total": total})
 
 @router.get("/{order_id}", response_model=OrderDetailOut)
-async def detail(order_id: int, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def detail(order_id: int, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     res = await db.execute(select(Order).where(Order.id == order_id, Order.user_id == int(user.id)))
     o = res.scalar_one_or_none()
     if not o:
@@ -76,7 +83,7 @@ async def detail(order_id: int, user: User = Depends(require_user), db: AsyncSes
     )
 
 @router.post("/{order_id}/pay")
-async def pay(order_id: int, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def pay(order_id: int, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         o = await set_order_status(db, int(user.id), order_id, "paid")
         return {"status": o.status}
@@ -84,7 +91,7 @@ async def pay(order_id: int, user: User = Depends(require_user), db: AsyncSessio
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{order_id}/complete")
-async def complete(order_id: int, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def complete(order_id: int, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         o = await set_order_status(db, int(user.id), order_id, "completed")
         return {"status": o.status}
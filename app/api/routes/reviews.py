@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
+from app.db.replica import get_read_db
 from app.core.deps import require_user
-from app.models.user import User
+from app.core.auth_cache import Principal
+from app.core.responses import trusted
 from app.schemas.review import ReviewCreateIn, ReviewOut, ReviewListOut
 from app.services.review_service import create_review, list_reviews_by_dish
 
@@ -11,7 +13,7 @@ router = APIRouter(prefix="/reviews")
 
 
 @router.post("", response_model=ReviewOut)
-async def create(payload: ReviewCreateIn, user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def create(payload: ReviewCreateIn, user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     try:
         rv = await create_review(
             db=db,
@@ -41,21 +43,7 @@ async def list_by_dish(
     dish_id: int,
     limit: int = Query(default=20, ge=1, le=50),
     offset: int = Query(default=0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     items, total = await list_reviews_by_dish(db, dish_id, limit=limit, offset=offset)
-    out = []
-    for rv in items:
-        out.append(
-            ReviewOut(
-                id=int(rv.id),
-                user_id=int(rv.user_id),
-                dish_id=int(rv.dish_id),
-                order_id=int(rv.order_id),
-                rating=int(rv.rating),
-                comment=rv.comment,
-                tags=list(rv.tags or []),
-                created_at=str(rv.created_at) if rv.created_at else None,
-            )
-        )
-    return ReviewListOut(items=out, total=total)
+    return trusted({"items": items, "total": total})
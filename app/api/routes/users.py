@@ -5,16 +5,17 @@ from datetime import datetime
 
 from app.db.session import get_db
 from app.core.deps import require_user
-from app.models.user import User
+from app.core.auth_cache import Principal
 from app.models.user_preferences import UserPreferences
 from app.models.events import PreferenceEvent
 from app.schemas.auth import MeOut
 from app.schemas.user import PreferencesOut, PreferencesUpdateIn
+from app.services.home_feed import publish_user_prefs_change
 
 router = APIRouter(prefix="/users")
 
 @router.get("/me", response_model=MeOut)
-async def me(user: User = Depends(require_user)):
+async def me(user: Principal = Depends(require_user)):
     return MeOut(
         id=int(user.id),
         username=user.username,
@@ -23,7 +24,7 @@ async def me(user: User = Depends(require_user)):
     )
 
 @router.get("/preferences", response_model=PreferencesOut)
-async def get_preferences(user: User = Depends(require_user), db: AsyncSession = Depends(get_db)):
+async def get_preferences(user: Principal = Depends(require_user), db: AsyncSession = Depends(get_db)):
     res = await db.execute(select(UserPreferences).where(UserPreferences.user_id == int(user.id)))
     pref = res.scalar_one_or_none()
     if not pref:
@@ -40,7 +41,7 @@ async def get_preferences(user: User = Depends(require_user), db: AsyncSession =
 @router.put("/preferences", response_model=PreferencesOut)
 async def update_preferences(
     data: PreferencesUpdateIn,
-    user: User = Depends(require_user),
+    user: Principal = Depends(require_user),
     db: AsyncSession = Depends(get_db),
 ):
     res = await db.execute(select(UserPreferences).where(UserPreferences.user_id == int(user.id)))
@@ -67,6 +68,7 @@ async def update_preferences(
 
     await db.commit()
     await db.refresh(pref)
+    await publish_user_prefs_change(int(user.id))
 
     return PreferencesOut(
         explicit_tags=list(pref.explicit_tags or []),
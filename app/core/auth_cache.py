@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus, publish_change
+
+
+# -----------------------------
+# 鉴权缓存（固定决策）
+# -----------------------------
+# - key = sha256(token)，不在内存里保存原始 token
+# - value = 已验签的 claims + 精简的 Principal（id/username/role/created_at），不缓存 ORM 对象
+# - 过期时间 = min(token exp, 写入时间 + AUTH_CACHE_TTL_SECONDS)；容量有上限，LRU 淘汰
+# - 角色变更 / 删除用户时按 user_id 失效（跨 worker 走 invalidation_bus 的 "user" 事件）
+# - 每个用户带一个代数：查库期间若发生失效，查到的旧结果不写回缓存
+
+USER_ENTITY = "user"
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    username: str
+    role: str
+    created_at: str | None = None
+
+
+@dataclass(slots=True)
+class _Entry:
+    principal: Principal
+    claims: dict
+    expires_at: float
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._generation: dict[int, int] = {}
+        self._all_generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, user_id: int) -> tuple[int, int]:
+        return self._all_generation, self._generation.get(int(user_id), 0)
+
+    def get(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, principal: Principal, claims: dict, generation: tuple[int, int]) -> None:
+        if self.ttl_s <= 0 or generation != self.generation(principal.id):
+            return
+        expires_at = time.time() + self.ttl_s
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        self._drop(key)
+        self._entries[key] = _Entry(principal=principal, claims=claims, expires_at=expires_at)
+        self._by_user.setdefault(principal.id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry.principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry.principal.id]
+
+    def invalidate_user(self, user_id: int | None) -> None:
+        if user_id is None:
+            self._entries.clear()
+            self._by_user.clear()
+            self._generation.clear()
+            self._all_generation += 1
+            return
+        user_id = int(user_id)
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+        for key in list(self._by_user.get(user_id, ())):
+            self._drop(key)
+
+
+principal_cache = PrincipalCache(ttl_s=settings.AUTH_CACHE_TTL_SECONDS, max_entries=settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def _apply_user_event(event: dict) -> None:
+    entity = str(event.get("entity") or "*")
+    if entity == USER_ENTITY:
+        entity_id = event.get("id")
+        principal_cache.invalidate_user(int(entity_id) if entity_id is not None else None)
+    elif entity == "*":
+        principal_cache.invalidate_user(None)
+
+
+invalidation_bus.subscribe(_apply_user_event)
+
+
+async def publish_user_change(user_id: int) -> None:
+    """用户角色变更/删除提交后调用：所有 worker 丢弃该用户已缓存的鉴权结果。"""
+    await publish_change(USER_ENTITY, int(user_id))
@@ -7,6 +7,31 @@ class Settings(BaseSettings):
 
     APP_NAME: str = "AI Order System"
     DATABASE_URL: str
+    # 连接池（每个 worker 一份）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0       # 等待空闲连接的秒数，超时抛错而不是无限排队
+    DB_POOL_RECYCLE: int = 1800         # 秒；早于 PgBouncer/防火墙的空闲断开时间
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: float = 10.0
+    # asyncpg
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_APPLICATION_NAME: str = "ai-order"
+    DB_SERVER_SETTINGS: dict[str, str] = {"jit": "off"}
+    # PgBouncer transaction 池化模式：关闭命名预编译语句
+    DB_PGBOUNCER: bool = False
+    # LISTEN/NOTIFY 需要会话级连接：走 PgBouncer 时这里填直连 Postgres 的地址（空 = DATABASE_URL）
+    INVALIDATION_DATABASE_URL: str = ""
+    # 只读副本（可选）：空 = 不启用；读路由在副本健康、且不在读己之写窗口内时走副本
+    DATABASE_REPLICA_URL: str = ""
+    READ_YOUR_WRITES_SECONDS: float = 10.0
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_INTERVAL_SECONDS: float = 5.0
+    REPLICA_SIMULATED_LAG_SECONDS: float = 0.0   # 仅测试：给测得的复制延迟叠加人为延迟
+    # SQL 观测：慢查询阈值（毫秒）；调试模式下同一请求内相同语句重复 ≥ 阈值次记疑似 N+1
+    DB_SLOW_QUERY_MS: float = 200.0
+    DB_DEBUG_N_PLUS_ONE: bool = False
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
     JWT_SECRET: str
     JWT_ALG: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 60 * 24 * 7
@@ -16,4 +41,20 @@ class Settings(BaseSettings):
     DEEPSEEK_BASE_URL: str = "https://api.deepseek.com"  # 你可按实际改
     DEEPSEEK_MODEL: str = "deepseek-chat"
 
+    # 菜单快照：管理端写入会立即失效；销量/评分变化靠 TTL 兜底
+    CATALOG_TTL_SECONDS: int = 60
+    # 跨 worker 缓存失效：postgres = LISTEN/NOTIFY；memory = 单进程/测试
+    INVALIDATION_BUS: str = "postgres"
+    INVALIDATION_CHANNEL: str = "cache_invalidation"
+    # 模糊检索（pg_trgm word_similarity）命中阈值：越低越能容错，召回也越杂
+    FUZZY_SEARCH_THRESHOLD: float = 0.3
+    # 鉴权缓存：已验签 token → 精简用户信息；角色变更/删除用户时主动失效
+    AUTH_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # 首页推荐：用户 → 标签组合的缓存存活时间（画像更新会主动失效，TTL 兜底漏掉的事件；0 = 不缓存）
+    HOME_FEED_USER_TTL_SECONDS: int = 300
+    # 口令哈希进程池：进程数（0 = 线程池）与排队上限（超过返回 503）
+    PASSWORD_POOL_WORKERS: int = 2
+    PASSWORD_POOL_MAX_QUEUE: int = 64
+
 settings = Settings()
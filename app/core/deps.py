@@ -6,19 +6,27 @@ from jose import JWTError, jwt
 from sqlalchemy import select
 
 from app.models.user import User
+from app.core.auth_cache import Principal, principal_cache, token_key
 from app.core.security import JWT_SECRET, JWT_ALG
-from app.db.session import AsyncSessionLocal  # 关键：独立 session
+from app.db.session import UnitOfWork, get_uow
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
-) -> User:
+    uow: UnitOfWork = Depends(get_uow),
+) -> Principal:
     if not credentials or not credentials.credentials:
         raise HTTPException(status_code=401, detail="not_authenticated")
 
     token = credentials.credentials
+    # 命中缓存：不验签、不查库（缓存项在 token 过期时一并失效）
+    key = token_key(token)
+    cached = principal_cache.get(key)
+    if cached is not None:
+        return cached.principal
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
         sub = payload.get("sub")
@@ -28,21 +36,31 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="invalid_token")
 
-    # 关键：鉴权查询用自己的 session，避免污染业务 session 的事务状态
-    async with AsyncSessionLocal() as db:
-        res = await db.execute(select(User).where(User.id == user_id))
-        user = res.scalar_one_or_none()
+    generation = principal_cache.generation(user_id)
+    # 与业务共用请求级 session（同一条连接）；查完立即结束这次只读事务，不带进业务事务
+    res = await uow.session.execute(
+        select(User.id, User.username, User.role, User.created_at).where(User.id == user_id)
+    )
+    row = res.one_or_none()
+    await uow.release()
 
-    if not user:
+    if not row:
         raise HTTPException(status_code=401, detail="user_not_found")
-    return user
+    principal = Principal(
+        id=int(row.id),
+        username=row.username,
+        role=row.role,
+        created_at=str(row.created_at) if row.created_at else None,
+    )
+    principal_cache.put(key, principal, payload, generation)
+    return principal
 
 
-async def require_user(user: User = Depends(get_current_user)) -> User:
+async def require_user(user: Principal = Depends(get_current_user)) -> Principal:
     return user
 
 
-async def require_admin(user: User = Depends(get_current_user)) -> User:
+async def require_admin(user: Principal = Depends(get_current_user)) -> Principal:
     if getattr(user, "role", "user") != "admin":
         raise HTTPException(status_code=403, detail="forbidden")
     return user
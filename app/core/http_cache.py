@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from pydantic_core import to_json
+
+
+# -----------------------------
+# 目录类接口的 HTTP 缓存（固定决策）
+# -----------------------------
+# - ETag = 菜单快照指纹 + 查询形态（path + 排序后的 query），强校验
+# - If-None-Match 命中直接 304，不查库、不序列化
+# - 未命中时按查询形态缓存序列化后的字节（>1KB 时同时缓存 gzip 版本），指纹变化即重建
+# - 同一资源的 gzip 表示使用不同的 ETag（强 ETag 要求字节级一致）
+
+GZIP_MIN_BYTES = 1024
+
+
+@dataclass(slots=True)
+class _Entry:
+    etag: str
+    body: bytes
+    gzip_body: bytes | None
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(self, shape: str, etag: str) -> _Entry | None:
+        entry = self._entries.get(shape)
+        if entry is None or entry.etag != etag:
+            return None
+        self._entries.move_to_end(shape)
+        return entry
+
+    def put(self, shape: str, entry: _Entry) -> None:
+        self._entries[shape] = entry
+        self._entries.move_to_end(shape)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+catalog_response_cache = ResponseCache()
+
+
+def query_shape(request: Request) -> str:
+    items = sorted(request.query_params.multi_items())
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+
+def make_etag(token: str, shape: str) -> str:
+    return f"{token}-{hashlib.blake2b(shape.encode(), digest_size=6).hexdigest()}"
+
+
+def _if_none_match(request: Request) -> set[str]:
+    raw = request.headers.get("if-none-match")
+    if not raw:
+        return set()
+    out = set()
+    for part in raw.split(","):
+        tag = part.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        out.add(tag.strip('"'))
+    return out
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    matches = _if_none_match(request)
+    return bool(matches) and (etag in matches or "*" in matches)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in (request.headers.get("accept-encoding") or "").lower()
+
+
+async def cached_json(
+    request: Request,
+    token: str,
+    build: Callable[[], Awaitable[object]],
+    cache: ResponseCache = catalog_response_cache,
+) -> Response:
+    """
+    token：数据版本指纹（如菜单快照 etag）；build：未命中时构造响应模型（或模型列表）。
+    返回已序列化好的 Response（跳过 FastAPI 的 response_model 二次校验）。
+    """
+    shape = query_shape(request)
+    etag = make_etag(token, shape)
+    gz = _accepts_gzip(request)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    matches = _if_none_match(request)
+    if matches and (etag in matches or f"{etag}.gz" in matches or "*" in matches):
+        tag = f"{etag}.gz" if gz and f"{etag}.gz" in matches else etag
+        return Response(status_code=304, headers={**headers, "ETag": f'"{tag}"'})
+
+    entry = cache.get(shape, etag)
+    if entry is None:
+        body = to_json(await build())
+        entry = _Entry(etag=etag, body=body, gzip_body=gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None)
+        cache.put(shape, entry)
+
+    if gz and entry.gzip_body is not None:
+        return Response(
+            content=entry.gzip_body,
+            media_type="application/json",
+            headers={**headers, "ETag": f'"{etag}.gz"', "Content-Encoding": "gzip"},
+        )
+    return Response(content=entry.body, media_type="application/json", headers={**headers, "ETag": f'"{etag}"'})
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------
+# 跨 worker 缓存失效通道（固定决策）
+# -----------------------------
+# - 通道本身放在 core，不依赖任何业务模块；各缓存（菜单快照、鉴权、首页推荐、规格索引）在自己的模块里 subscribe
+# - 事件格式：{"entity": "dish" | "category" | ..., "id": int | None, "version": int}
+Handler = Callable[[dict], None]
+
+
+class InvalidationBus(ABC):
+    """
+    跨 worker 缓存失效通道。
+    - publish：广播一条失效事件
+    - subscribe：注册本 worker 的处理函数（同步、需幂等：发布者自己也会收到回声）
+    """
+
+    def __init__(self):
+        self._handlers: list[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def dispatch(self, event: dict) -> None:
+        for h in self._handlers:
+            try:
+                h(event)
+            except Exception:
+                logger.exception("invalidation handler failed: %s", event)
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    @abstractmethod
+    async def publish(self, event: dict) -> None:
+        ...
+
+
+class MemoryInvalidationBus(InvalidationBus):
+    """单进程/测试用：publish 直接在本进程分发。"""
+
+    async def publish(self, event: dict) -> None:
+        self.dispatch(event)
+
+
+class PgNotifyInvalidationBus(InvalidationBus):
+    """
+    基于 Postgres LISTEN/NOTIFY：
+    - 每个 worker 持有一条独立的 asyncpg 连接做 LISTEN（不占用 SQLAlchemy 连接池）
+    - 连接断开期间可能漏事件，因此重连成功后按“全量失效”处理
+    - 启动时只做有限次（带超时）的连接尝试；连不上不阻塞启动，转入后台重连，期间靠各缓存的 TTL 兜底
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        reconnect_delay_s: float = 2.0,
+        connect_timeout_s: float = 10.0,
+        start_attempts: int = 3,
+    ):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay_s = reconnect_delay_s
+        self.connect_timeout_s = connect_timeout_s
+        self.start_attempts = max(1, int(start_attempts))
+        self._conn = None
+        self._conn_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def _on_notify(self, conn, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("invalid invalidation payload: %r", payload)
+            return
+        if isinstance(event, dict):
+            self.dispatch(event)
+
+    def _on_terminate(self, conn) -> None:
+        if self._closing:
+            return
+        logger.warning("invalidation listener connection lost, reconnecting")
+        self._conn = None
+        self._task = asyncio.get_running_loop().create_task(self._connect_loop(resync=True))
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn, timeout=self.connect_timeout_s)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminate)
+        self._conn = conn
+
+    async def _connect_loop(self, resync: bool) -> None:
+        while not self._closing:
+            try:
+                await self._connect()
+                break
+            except Exception:
+                logger.exception("invalidation listener connect failed")
+                await asyncio.sleep(self.reconnect_delay_s)
+        if resync and not self._closing:
+            self.dispatch({"entity": "*", "id": None, "version": None})
+
+    async def start(self) -> None:
+        self._closing = False
+        for attempt in range(1, self.start_attempts + 1):
+            try:
+                await asyncio.wait_for(self._connect(), timeout=self.connect_timeout_s)
+                return
+            except Exception as e:
+                logger.warning("invalidation listener connect failed (%d/%d): %r", attempt, self.start_attempts, e)
+            if attempt < self.start_attempts:
+                await asyncio.sleep(self.reconnect_delay_s)
+        logger.error("invalidation listener unavailable at startup, retrying in background")
+        self._task = asyncio.get_running_loop().create_task(self._connect_loop(resync=True))
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def publish(self, event: dict) -> None:
+        conn = self._conn
+        if conn is None:
+            raise RuntimeError("invalidation_bus_not_connected")
+        # asyncpg 单连接不允许并发执行，publish 串行化（管理端写入频率很低）
+        async with self._conn_lock:
+            await conn.execute("SELECT pg_notify($1, $2)", self.channel, json.dumps(event))
+
+
+def _build_bus() -> InvalidationBus:
+    if settings.INVALIDATION_BUS == "postgres":
+        url = settings.INVALIDATION_DATABASE_URL or settings.DATABASE_URL
+        dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PgNotifyInvalidationBus(
+            dsn=dsn, channel=settings.INVALIDATION_CHANNEL, connect_timeout_s=settings.DB_CONNECT_TIMEOUT
+        )
+    return MemoryInvalidationBus()
+
+
+invalidation_bus = _build_bus()
+
+
+async def publish_change(entity: str, entity_id: int | None, version: int | None = None) -> None:
+    """
+    写入提交后调用：先在本 worker 分发（保证自己的下一次读就是新数据），再广播给其它 worker。
+    广播失败只记日志，其它 worker 靠各自缓存的 TTL 兜底。
+    """
+    event = {"entity": entity, "id": entity_id, "version": version}
+    invalidation_bus.dispatch(event)
+    if isinstance(invalidation_bus, MemoryInvalidationBus):
+        return
+    try:
+        await invalidation_bus.publish(event)
+    except Exception:
+        logger.exception("publish invalidation failed: %s %s", entity, entity_id)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+from app.core.config import settings
+from app.db.instrumentation import current_stats, finish_request, start_request
+from app.db.replica import LAST_WRITE_COOKIE
+
+
+class ServerTimingMiddleware:
+    """
+    纯 ASGI 中间件（不用 BaseHTTPMiddleware，避免额外的任务/流包装开销）：
+    - 请求开始时挂一份 QueryStats
+    - 响应头写入 Server-Timing：db（SQL 条数与累计耗时）+ app（处理总耗时）
+    - 响应头发出之后才执行的 SQL 不计入
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_request()
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - t0) * 1000
+                value = (
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", '
+                    f"app;dur={app_ms:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish_request(token, f'{scope.get("method", "")} {scope.get("path", "")}')
+
+
+class ReadYourWritesMiddleware:
+    """
+    本请求执行过写语句且成功（< 400）时种 last_write cookie（毫秒时间戳），
+    之后 READ_YOUR_WRITES_SECONDS 内该客户端的只读路由走主库（见 app/db/replica.py）。
+    需注册在 ServerTimingMiddleware 内层（依赖它挂好的 QueryStats）。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        stats = current_stats() if scope["type"] == "http" else None
+        if stats is None or not settings.DATABASE_REPLICA_URL:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and stats.wrote and message["status"] < 400:
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={int(time.time() * 1000)}; Path=/; "
+                    f"Max-Age={int(settings.READ_YOUR_WRITES_SECONDS) + 1}; HttpOnly; SameSite=Lax"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
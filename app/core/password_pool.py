@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from app.core.config import settings
+from app.core.security import hash_password, verify_password
+
+
+# -----------------------------
+# 口令哈希进程池（固定决策）
+# -----------------------------
+# - PBKDF2 是纯 CPU 计算（单次数十毫秒），放在事件循环里会卡住同 worker 的所有请求
+# - 交给独立的进程池执行（绕开 GIL），事件循环只 await 结果
+# - 并发上限 = 进程数；排队上限 PASSWORD_POOL_MAX_QUEUE，超过直接拒绝（路由返回 503），不无限堆积
+# - PASSWORD_POOL_WORKERS=0：退化为线程池执行（单测/不便起子进程的环境）
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(0, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self._executor: ProcessPoolExecutor | None = None
+        self._sem: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        # 最近 N 次的（排队 + 计算）耗时，毫秒
+        self._latencies: deque[float] = deque(maxlen=1024)
+
+    @property
+    def concurrency(self) -> int:
+        return self.workers or 4
+
+    def start(self) -> None:
+        if self.workers and self._executor is None:
+            # spawn：子进程不继承事件循环/连接池等父进程状态
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable, *args):
+        if self.in_flight >= self.concurrency and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordPoolBusy("password_pool_busy")
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        self.start()
+
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # executor=None 时用默认线程池
+            result = await loop.run_in_executor(self._executor, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._sem.release()
+            self._latencies.append((time.perf_counter() - t0) * 1000)
+        # completed 只计成功；被拒绝的计入 rejected，抛异常的计入 failed
+        self.completed += 1
+        return result
+
+    def metrics(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p: float) -> float | None:
+            if not lat:
+                return None
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 2)
+
+        return {
+            "mode": "process" if self.workers else "thread",
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p99": pct(0.99),
+        }
+
+
+password_pool = PasswordPool(workers=settings.PASSWORD_POOL_WORKERS, max_queue=settings.PASSWORD_POOL_MAX_QUEUE)
+
+
+async def hash_password_async(raw: str) -> str:
+    return await password_pool.run(hash_password, raw)
+
+
+async def verify_password_async(raw: str, hashed: str) -> bool:
+    # 空口令/超长口令无需进池，直接判否（与 verify_password 的前置检查一致）
+    if not raw or not hashed or len(str(raw)) > 128:
+        return False
+    return await password_pool.run(verify_password, raw, hashed)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+# -----------------------------
+# JSON 响应（固定决策）
+# -----------------------------
+# - 全局默认响应类用 orjson 序列化（main.py 的 default_response_class）
+# - FastAPI 对普通返回值仍会按 response_model 校验 + jsonable_encoder 一遍，再交给响应类；
+#   热点列表接口改为 return trusted(...)：直接返回 Response，FastAPI 原样发出，不再二次校验/编码
+# - trusted 的内容由调用方保证与路由声明的 response_model 一致（字段名、类型都已是 JSON 友好的），
+#   路由上的 response_model 保留，只用于 OpenAPI 文档
+# - 可以是已构造好的 Pydantic 模型，也可以是列查询直接得到的 dict（见 app/db/read.py）
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted(content: Any, status_code: int = 200, headers: dict[str, str] | None = None) -> FastJSONResponse:
+    """已按 response_model 构造好的内容：跳过 FastAPI 的二次校验，直接序列化发出。"""
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
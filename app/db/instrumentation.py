@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# SQL 观测（固定决策）
+# -----------------------------
+# - 挂在引擎的 before/after_cursor_execute 事件上，对业务代码零侵入
+# - 每个请求一份 QueryStats，放在 contextvar 里（SQLAlchemy 的 greenlet 会继承调用方的 context）
+# - 慢查询按“归一化 SQL”（参数/字面量替换为 ?，IN 列表折叠）记日志，同一形态的语句聚合在一起
+# - DB_DEBUG_N_PLUS_ONE=true 时，同一请求内归一化后相同的语句重复 ≥ 阈值次，记一条疑似 N+1 告警
+# - 汇总通过 Server-Timing 响应头暴露（见 app/core/middleware.py）
+# - 写语句同时记到所属 session 的 info["wrote"]（事务开始时把 session.info 挂到连接上，
+#   连接 commit/rollback 时摘下并清零）：ORM flush 之后、以及 Core DML 都不会出现在
+#   session.new/dirty/deleted 里，release_connection 靠这个标记判断事务里是否有未提交的写入
+
+
+@dataclass(slots=True)
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    # 本请求是否执行过写语句（读己之写路由用）
+    wrote: bool = False
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(\s*__\[POSTCOMPILE_\w+\]\s*\)")
+_SPACES = re.compile(r"\s+")
+_WRITE = re.compile(r"\bINSERT\s+INTO\b|\bUPDATE\s+\S+\s+SET\b|\bDELETE\s+FROM\b", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    s = _POSTCOMPILE.sub("(?)", sql)
+    s = _STRING.sub("?", s)
+    s = _PARAM.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("IN (?)", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+def start_request() -> tuple[QueryStats, object]:
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token, label: str) -> QueryStats | None:
+    stats = _current.get()
+    _current.reset(token)
+    if stats is not None and settings.DB_DEBUG_N_PLUS_ONE:
+        for shape, n in stats.shapes.items():
+            if n >= settings.DB_N_PLUS_ONE_THRESHOLD:
+                logger.warning("possible N+1 in %s: %d x %s", label, n, shape)
+    return stats
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _current.get()
+    slow = elapsed_ms >= settings.DB_SLOW_QUERY_MS
+    shape = None
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        if not stats.wrote and _WRITE.search(statement):
+            stats.wrote = True
+        if settings.DB_DEBUG_N_PLUS_ONE:
+            shape = normalize_sql(statement)
+            stats.shapes[shape] += 1
+    session_info = conn.info.get("session_info")
+    if session_info is not None and not session_info.get("wrote") and _WRITE.search(statement):
+        session_info["wrote"] = True
+    if slow:
+        logger.warning("slow query %.1fms: %s", elapsed_ms, shape or normalize_sql(statement))
+
+
+def _error(exc_context):
+    # 语句失败时不会触发 after_cursor_execute，弹出对应的开始时间
+    conn = exc_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def _bind_session(session, transaction, connection) -> None:
+    session.info["wrote"] = False
+    connection.info["session_info"] = session.info
+
+
+def _end_transaction(conn) -> None:
+    session_info = conn.info.pop("session_info", None)
+    if session_info is not None:
+        session_info["wrote"] = False
+
+
+def instrument(engine: Engine) -> None:
+    """给同步引擎（AsyncEngine.sync_engine）挂观测事件；重复调用无副作用。"""
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+        event.listen(engine, "handle_error", _error)
+        event.listen(engine, "commit", _end_transaction)
+        event.listen(engine, "rollback", _end_transaction)
+    if not event.contains(Session, "after_begin", _bind_session):
+        event.listen(Session, "after_begin", _bind_session)
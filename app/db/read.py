@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from sqlalchemy import Float, case, cast, func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+# -----------------------------
+# 轻量读路径（固定决策）
+# -----------------------------
+# - 列表类只读接口不加载 ORM 实体：只 select 需要的列，经会话当前连接以 Core 方式执行，
+#   不进 identity map、不建实体状态，行直接转成响应用的 dict
+# - 类型转换尽量下推到 SQL：DECIMAL → float8、TIMESTAMP → to_char 显式格式（见 as_timestamp_text）、
+#   可空 JSONB 用 coalesce 给默认值，Python 侧不再逐字段 int()/float()
+# - 列名即响应字段名（用 label 对齐），新增字段时两边同步
+# - 仍复用调用方的 AsyncSession（主库/副本路由、请求级 SQL 统计都不受影响）
+
+
+def as_float(col, name: str | None = None):
+    return cast(col, Float).label(name or col.key)
+
+
+def as_timestamp_text(col, name: str | None = None):
+    """
+    TIMESTAMP → 与 str(datetime) 逐字一致的文本：'YYYY-MM-DD HH:MM:SS[.ffffff]'（微秒为 0 时省略）。
+    不用 ::text：Postgres 会去掉小数末尾的 0，且输出随 DateStyle 变化。
+    """
+    return case(
+        (func.date_trunc("second", col) == col, func.to_char(col, "YYYY-MM-DD HH24:MI:SS")),
+        else_=func.to_char(col, "YYYY-MM-DD HH24:MI:SS.US"),
+    ).label(name or col.key)
+
+
+def json_or(col, default: str, name: str | None = None):
+    return func.coalesce(col, literal_column(f"'{default}'::jsonb")).label(name or col.key)
+
+
+async def fetch_dicts(db: AsyncSession, stmt: Select) -> list[dict]:
+    conn = await db.connection()
+    res = await conn.execute(stmt)
+    return [dict(m) for m in res.mappings()]
+
+
+async def fetch_scalar(db: AsyncSession, stmt: Select):
+    conn = await db.connection()
+    return (await conn.execute(stmt)).scalar()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import UnitOfWork, get_uow, replica_engine
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# 读写分离（固定决策）
+# -----------------------------
+# - 只读路由用 get_read_db：副本健康且不在“读己之写”窗口内时走副本，否则走主库
+# - 读己之写：成功的写请求（POST/PUT/PATCH/DELETE 2xx）由中间件种一个 last_write cookie（毫秒时间戳），
+#   READ_YOUR_WRITES_SECONDS 内该客户端的读请求一律走主库；cookie 由客户端携带，多 worker 无需共享状态
+# - 健康检查：后台定期查复制延迟，超过 REPLICA_MAX_LAG_SECONDS 或查询失败即熔断（全部回主库），
+#   下一次检查通过后恢复；请求中出现断连错误也会立即熔断
+# - 本地测试可把两个 DSN 指向同一个库，用 REPLICA_SIMULATED_LAG_SECONDS 叠加人为延迟来演练熔断
+
+LAST_WRITE_COOKIE = "last_write"
+
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+
+class ReplicaHealth:
+    def __init__(self, max_lag_s: float, interval_s: float, simulated_lag_s: float = 0.0):
+        self.max_lag_s = float(max_lag_s)
+        self.interval_s = float(interval_s)
+        self.simulated_lag_s = float(simulated_lag_s)
+        # 启动后第一次检查通过之前不使用副本
+        self.healthy = False
+        self.lag_s: float | None = None
+        self.last_error: str | None = None
+        self.checked_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def trip(self, reason: str) -> None:
+        if self.healthy:
+            logger.warning("replica circuit open: %s", reason)
+        self.healthy = False
+        self.last_error = reason
+
+    async def check(self) -> bool:
+        if replica_engine is None:
+            self.healthy = False
+            return False
+        try:
+            async with replica_engine.connect() as conn:
+                lag = float((await conn.execute(_LAG_SQL)).scalar() or 0.0)
+        except Exception as e:
+            self.trip(f"check_failed: {e.__class__.__name__}")
+            return False
+        finally:
+            self.checked_at = time.time()
+        self.lag_s = lag + self.simulated_lag_s
+        if self.lag_s > self.max_lag_s:
+            self.trip(f"lag {self.lag_s:.1f}s")
+            return False
+        if not self.healthy:
+            logger.info("replica circuit closed (lag %.2fs)", self.lag_s)
+        self.healthy = True
+        self.last_error = None
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> None:
+        if replica_engine is not None and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "configured": replica_engine is not None,
+            "healthy": self.healthy,
+            "lag_s": self.lag_s,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+
+replica_health = ReplicaHealth(
+    max_lag_s=settings.REPLICA_MAX_LAG_SECONDS,
+    interval_s=settings.REPLICA_HEALTH_INTERVAL_SECONDS,
+    simulated_lag_s=settings.REPLICA_SIMULATED_LAG_SECONDS,
+)
+
+
+if replica_engine is not None:
+    @event.listens_for(replica_engine.sync_engine, "handle_error")
+    def _on_replica_error(exc_context):
+        if exc_context.is_disconnect:
+            replica_health.trip("disconnect")
+
+
+def recently_wrote(request: Request) -> bool:
+    raw = request.cookies.get(LAST_WRITE_COOKIE)
+    if not raw:
+        return False
+    try:
+        ts = int(raw) / 1000
+    except ValueError:
+        return False
+    return time.time() - ts < settings.READ_YOUR_WRITES_SECONDS
+
+
+async def get_read_db(request: Request, uow: UnitOfWork = Depends(get_uow)) -> AsyncSession:
+    if replica_health.healthy and not recently_wrote(request):
+        replica = uow.replica_session
+        if replica is not None:
+            return replica
+    return uow.session
@@ -1,14 +1,57 @@
-import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from dotenv import load_dotenv
+from uuid import uuid4
 
-load_dotenv()
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set")
+from app.core.config import settings
+from app.db.instrumentation import instrument
 
-engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+
+# -----------------------------
+# 引擎与连接池（固定决策）
+# -----------------------------
+# - 全部参数来自 Settings（.env），不再直接读 os.environ
+# - 多 worker 部署时：单 worker 连接上限 = DB_POOL_SIZE + DB_MAX_OVERFLOW，总数需小于 Postgres max_connections
+# - DB_PGBOUNCER=true（PgBouncer transaction 池化）：
+#   * 同一会话的语句可能落到不同的后端连接上，命名预编译语句会串台 → 关闭 asyncpg 语句缓存，
+#     预编译语句名改为随机（不复用）
+#   * PgBouncer 只透传少数启动参数，server_settings 只保留 application_name；
+#     其它参数（如 jit、statement_timeout）请用 ALTER ROLE ... SET 配在库端
+
+
+def _server_settings() -> dict[str, str]:
+    out = {"application_name": settings.DB_APPLICATION_NAME}
+    if not settings.DB_PGBOUNCER:
+        out.update({str(k): str(v) for k, v in settings.DB_SERVER_SETTINGS.items()})
+    return out
+
+
+def engine_kwargs() -> dict:
+    connect_args: dict = {"server_settings": _server_settings(), "timeout": settings.DB_CONNECT_TIMEOUT}
+    if settings.DB_PGBOUNCER:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        # SQLAlchemy asyncpg 方言自己的预编译语句缓存
+        connect_args["prepared_statement_cache_size"] = 0
+    else:
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def build_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, **engine_kwargs())
+    instrument(engine.sync_engine)
+    return engine
+
+
+engine = build_engine(settings.DATABASE_URL)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -18,9 +61,91 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+# 只读副本（可选）：未配置 DATABASE_REPLICA_URL 时为 None，读路由全部走主库
+replica_engine: AsyncEngine | None = build_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+
+ReplicaSessionLocal = async_sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+) if replica_engine is not None else None
+
+# -----------------------------
+# 请求级工作单元（固定决策）
+# -----------------------------
+# - 一个请求只有一个 AsyncSession：鉴权与业务共用（FastAPI 依赖缓存保证同一请求拿到同一个 UnitOfWork）
+# - session 懒创建；连接只在真正执行 SQL 时才从池里取（AsyncSession 自身的行为）
+# - release()：结束当前只读事务、把连接还给池，session 仍可继续使用（下次执行再取）
+#   用于鉴权查询之后（不把鉴权读带进业务事务）、以及慢的外部调用（大模型）之前
+
+
+class UnitOfWork:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        replica_factory: async_sessionmaker | None = None,
+    ):
+        self._factory = session_factory
+        self._replica_factory = replica_factory if replica_factory is not None else ReplicaSessionLocal
+        self._session: AsyncSession | None = None
+        self._replica: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+            self._session.info["uow"] = self
+        return self._session
+
+    @property
+    def replica_session(self) -> AsyncSession | None:
+        """只读副本上的 session（同样懒创建）；未配置副本时为 None。"""
+        if self._replica is None and self._replica_factory is not None:
+            self._replica = self._replica_factory()
+            self._replica.info["uow"] = self
+            self._replica.info["replica"] = True
+        return self._replica
+
+    async def release(self) -> None:
+        if self._session is not None:
+            await release_connection(self._session)
+
+    async def close(self) -> None:
+        for s in (self._session, self._replica):
+            if s is not None:
+                await s.close()
+        self._session = self._replica = None
+
+
+def primary_of(session: AsyncSession) -> AsyncSession:
+    """副本 session → 同一请求的主库 session（如菜单快照重载必须读主库）；其它 session 原样返回。"""
+    if session.info.get("replica"):
+        return session.info["uow"].session
+    return session
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    结束只读事务（rollback）并归还连接；有未提交的写入时不动（交给业务自己 commit/rollback）。
+    “有写入” = 还没 flush 的 ORM 变更，或本事务已执行过写语句（info["wrote"]，见 app/db/instrumentation.py）。
+    注意 rollback 会让已加载的 ORM 对象过期：释放之后还要用的字段，调用方需在释放前取出。
+    """
+    if not session.in_transaction():
+        return
+    if session.new or session.dirty or session.deleted or session.info.get("wrote"):
+        return
+    await session.rollback()
+
+
+async def get_uow():
+    uow = UnitOfWork()
+    try:
+        yield uow
+    finally:
+        await uow.close()
+
+
+async def get_db(uow: UnitOfWork = Depends(get_uow)) -> AsyncSession:
+    return uow.session
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, HTTPException, status, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -7,8 +9,31 @@ from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
 from app.api.router import api_router
+from app.core.middleware import ReadYourWritesMiddleware, ServerTimingMiddleware
+from app.core.password_pool import password_pool
+from app.core.responses import FastJSONResponse
+from app.db.replica import replica_health
+from app.core.invalidation import invalidation_bus
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 每个 worker 启动时订阅缓存失效通道，并创建口令哈希进程池（子进程在首次使用时启动）
+    await invalidation_bus.start()
+    password_pool.start()
+    replica_health.start()
+    try:
+        yield
+    finally:
+        await replica_health.stop()
+        password_pool.shutdown()
+        await invalidation_bus.stop()
+
 
-app = FastAPI(title=settings.APP_NAME)
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan, default_response_class=FastJSONResponse)
+# 后注册的在外层：ServerTiming 先挂好 QueryStats，ReadYourWrites 再据此决定是否种 cookie
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 app.include_router(api_router, prefix="/api")
 
 async def get_current_user(
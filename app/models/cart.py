@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Integer, TIMESTAMP
+from sqlalchemy import BigInteger, Integer, Text, TIMESTAMP
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -8,6 +8,7 @@ class Cart(Base):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, unique=True)
     updated_at: Mapped[str | None] = mapped_column(TIMESTAMP)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
 
 class CartItem(Base):
     __tablename__ = "cart_items"
@@ -16,4 +17,6 @@ class CartItem(Base):
     dish_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     selected_specs: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    # selected_specs::jsonb::text，(cart_id, dish_id, spec_key) 唯一（见 cart_service._spec_key）
+    spec_key: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
     created_at: Mapped[str | None] = mapped_column(TIMESTAMP)
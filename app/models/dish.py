@@ -19,6 +19,7 @@ class Dish(Base):
     image_url: Mapped[str | None] = mapped_column(String(255))
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="on_sale")
     ai_metadata: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    ai_highlights: Mapped[list] = mapped_column(JSONB, nullable=False, default=list)
     sales_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     rating_avg: Mapped[float] = mapped_column(DECIMAL(3,1), nullable=False, default=5.0)
     rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
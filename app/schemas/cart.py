@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 class CartItemIn(BaseModel):
     dish_id: int
@@ -13,10 +15,27 @@ class CartItemOut(BaseModel):
     id: int
     dish_id: int
     dish_name: str
-    price: float
+    price: float                 # 当前菜价
+    spec_delta: float = 0.0      # 选中规格的加价合计
+    unit_price: float            # price + spec_delta
     quantity: int
     selected_specs: dict
+    image_url: str | None = None
+    status: str = "on_sale"      # 非在售的明细保留展示，但不计入 total_amount
 
 class CartOut(BaseModel):
     items: list[CartItemOut]
     total_amount: float
+    # 每次写购物车 +1；PATCH /cart 可带上做乐观并发校验
+    version: int = 0
+
+class CartOpIn(BaseModel):
+    op: Literal["add", "update", "remove", "clear"]
+    item_id: int | None = None          # update / remove
+    dish_id: int | None = None          # add
+    quantity: int | None = Field(default=None, ge=0, le=99)  # add ≥ 1；update 传 0 等同 remove
+    selected_specs: dict | None = None  # add / update
+
+class CartPatchIn(BaseModel):
+    ops: list[CartOpIn] = Field(min_length=1, max_length=100)
+    version: int | None = None          # 与当前版本不一致时 409 cart_version_conflict
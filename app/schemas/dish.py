@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class CategoryOut(BaseModel):
     id: int
@@ -18,7 +18,10 @@ class DishListItem(BaseModel):
 
 class DishListOut(BaseModel):
     items: list[DishListItem]
-    total: int
+    # 分页列表默认不计算总数（include_total=true 时返回）
+    total: int | None = None
+    # 下一页游标；None 表示已到末页
+    next_cursor: str | None = None
 
 class DishSpecOut(BaseModel):
     id: int
@@ -38,3 +41,16 @@ class DishDetailOut(BaseModel):
     sales_count: int
     ai_metadata: dict
     specs: list[DishSpecOut]
+
+class DishBatchIn(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=100)
+
+class DishBatchOut(BaseModel):
+    # 与请求 ids 同序（重复 id 只返回一次）；不存在的 id 列在 missing
+    items: list[DishDetailOut]
+    missing: list[int] = []
+
+class DishSuggestionOut(BaseModel):
+    kind: str  # dish / category
+    id: int
+    text: str
@@ -13,6 +13,13 @@ class OrderCreateIn(BaseModel):
     items: list[OrderCreateItemIn]
 
 
+class OrderFromCartIn(BaseModel):
+    address_id: int
+    note: str | None = None
+    # 结算页展示的购物车版本（GET /cart 的 version）；传入时与服务端不一致返回 409
+    cart_version: int | None = None
+
+
 class OrderCreateOut(BaseModel):
     order_id: int
     status: str
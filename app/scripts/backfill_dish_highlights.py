@@ -0,0 +1,54 @@
+"""
+回填 dishes.ai_highlights（由 ai_metadata 派生）。
+
+用法：
+    python -m app.scripts.backfill_dish_highlights [--batch-size 500]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from sqlalchemy import select, update
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.dish import Dish
+from app.services.dish_meta import compute_highlights
+
+
+async def backfill(batch_size: int) -> int:
+    changed = 0
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            res = await db.execute(
+                select(Dish.id, Dish.ai_metadata, Dish.ai_highlights)
+                .where(Dish.id > last_id)
+                .order_by(Dish.id.asc())
+                .limit(batch_size)
+            )
+            rows = res.all()
+            if not rows:
+                break
+            for r in rows:
+                hl = compute_highlights(r.ai_metadata or {})
+                if hl != list(r.ai_highlights or []):
+                    await db.execute(update(Dish).where(Dish.id == r.id).values(ai_highlights=hl))
+                    changed += 1
+            last_id = int(rows[-1].id)
+            await db.commit()
+    await engine.dispose()
+    return changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="backfill dishes.ai_highlights")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    changed = asyncio.run(backfill(args.batch_size))
+    # 各 worker 的菜单快照靠 TTL 自动刷新；需要立即生效可重启服务
+    print(f"backfilled {changed} dishes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,158 @@
-import json
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import BigInteger, Integer, Text, bindparam, cast, column, delete, func, literal, select, update, values
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by, insert as pg_insert
 from datetime import datetime
 
+from app.db.read import as_float, fetch_dicts, fetch_scalar
 from app.models.cart import Cart, CartItem
-from app.models.dish import Dish
+from app.models.dish import Dish, DishSpec
+from app.services.spec_index import compile_specs, spec_price_delta
 
-def _spec_key(selected_specs: dict) -> str:
-    # 固定决策：spec 合并键 = JSON 排序字符串
-    return json.dumps(selected_specs or {}, ensure_ascii=False, sort_keys=True)
+# 固定决策：spec 合并键 = selected_specs 转 jsonb 后的规范文本（键排序/空白由 Postgres 统一），
+# 持久化在 cart_items.spec_key，(cart_id, dish_id, spec_key) 唯一；在 SQL 里计算，与迁移回填的值逐字一致
+def _spec_key(specs):
+    return cast(cast(specs, JSONB), Text)
 
-async def get_or_create_cart(db: AsyncSession, user_id: int) -> Cart:
+async def _get_cart(db: AsyncSession, user_id: int) -> Cart | None:
+    # 固定决策：购物车在第一次写入时才创建（加购/PATCH 的 upsert），读路径不建行、不提交
     res = await db.execute(select(Cart).where(Cart.user_id == user_id))
-    cart = res.scalar_one_or_none()
-    if cart:
-        return cart
-    cart = Cart(user_id=user_id, updated_at=datetime.utcnow())
-    db.add(cart)
-    await db.commit()
-    await db.refresh(cart)
-    return cart
-
-async def get_cart_view(db: AsyncSession, user_id: int) -> tuple[list[dict], float]:
-    cart = await get_or_create_cart(db, user_id)
-    items_res = await db.execute(select(CartItem).where(CartItem.cart_id == cart.id))
-    items = list(items_res.scalars().all())
-    dish_ids = [it.dish_id for it in items]
-    dish_map = {}
-    if dish_ids:
-        dish_res = await db.execute(select(Dish).where(Dish.id.in_(dish_ids)))
-        dish_map = {int(d.id): d for d in dish_res.scalars().all()}
+    return res.scalar_one_or_none()
+
+def _touch(cart: Cart) -> None:
+    # 每次写购物车：版本 +1（在 UPDATE 里自增，并发写不会丢计数）
+    cart.version = Cart.version + 1
+    cart.updated_at = datetime.utcnow()
+
+async def get_cart_version(db: AsyncSession, user_id: int) -> int:
+    """还没有购物车 = 版本 0。"""
+    t = Cart.__table__
+    return int(await fetch_scalar(db, select(t.c.version).where(t.c.user_id == user_id)) or 0)
+
+async def get_cart_view(db: AsyncSession, user_id: int) -> tuple[list[dict], float, int]:
+    """
+    一条 SQL：carts LEFT JOIN cart_items JOIN dishes，每行同时带出该菜的规格定义（相关子查询，按 id 排序）。
+    规格加价用 compile_specs + spec_price_delta 计算，与下单/结算同一口径。
+    返回 (明细, 合计, 版本)；单价 = 当前菜价 + 规格加价，合计只计在售菜品。
+    """
+    c, ci, d, s = Cart.__table__, CartItem.__table__, Dish.__table__, DishSpec.__table__
+    spec_defs = (
+        select(func.jsonb_agg(
+            aggregate_order_by(func.jsonb_build_array(s.c.spec_name, s.c.spec_values), s.c.id), type_=JSONB,
+        ))
+        .where(s.c.dish_id == ci.c.dish_id)
+        .scalar_subquery()
+        .label("spec_defs")
+    )
+    rows = await fetch_dicts(db, (
+        select(
+            c.c.version, ci.c.id, ci.c.dish_id, ci.c.quantity, ci.c.selected_specs,
+            d.c.name.label("dish_name"), as_float(d.c.price), d.c.image_url, d.c.status, spec_defs,
+        )
+        .select_from(c.outerjoin(ci.join(d, d.c.id == ci.c.dish_id), ci.c.cart_id == c.c.id))
+        .where(c.c.user_id == user_id)
+        .order_by(ci.c.id)
+    ))
+    if not rows:
+        return [], 0.0, 0
 
+    version = int(rows[0]["version"])
+    # 空购物车：LEFT JOIN 出一行全空的明细
+    rows = [r for r in rows if r["id"] is not None]
     view_items = []
     total = 0.0
-    for it in items:
-        dish = dish_map.get(int(it.dish_id))
-        if not dish:
-            continue
-        price = float(dish.price)
-        line = price * int(it.quantity)
-        total += line
-        view_items.append({
-            "id": int(it.id),
-            "dish_id": int(it.dish_id),
-            "dish_name": dish.name,
-            "price": price,
-            "quantity": int(it.quantity),
-            "selected_specs": it.selected_specs or {}
-        })
-    return view_items, round(total, 2)
+    for r in rows:
+        del r["version"]
+        spec_index = compile_specs(r.pop("spec_defs") or [])
+        r["spec_delta"] = round(spec_price_delta(spec_index, r["selected_specs"] or {}), 2)
+        r["unit_price"] = round(r["price"] + r["spec_delta"], 2)
+        if r["status"] == "on_sale":
+            total += r["unit_price"] * r["quantity"]
+        r["selected_specs"] = r["selected_specs"] or {}
+        view_items.append(r)
+    return view_items, round(total, 2), version
 
-async def add_to_cart(db: AsyncSession, user_id: int, dish_id: int, quantity: int, selected_specs: dict) -> None:
-    cart = await get_or_create_cart(db, user_id)
+async def lock_cart_lines(db: AsyncSession, user_id: int) -> tuple[int | None, int, list[dict]]:
+    """
+    结算用：锁住该用户的购物车行与全部明细（FOR UPDATE，直到事务结束），同一条语句带出
+    菜名/当前菜价/在售状态/AI 元数据（规格加价由调用方按规格索引计算）。返回 (cart_id, version, 明细)；没有明细时 cart_id 为 None。
+    """
+    c, ci, d = Cart.__table__, CartItem.__table__, Dish.__table__
+    rows = await fetch_dicts(db, (
+        select(
+            c.c.id.label("cart_id"), c.c.version, ci.c.id, ci.c.dish_id, ci.c.quantity, ci.c.selected_specs,
+            d.c.name.label("dish_name"), as_float(d.c.price), d.c.status, d.c.ai_metadata,
+        )
+        .select_from(c.join(ci, ci.c.cart_id == c.c.id).join(d, d.c.id == ci.c.dish_id))
+        .where(c.c.user_id == user_id)
+        .order_by(ci.c.id)
+        .with_for_update(of=[c, ci])
+    ))
+    if not rows:
+        return None, 0, []
+    return int(rows[0]["cart_id"]), int(rows[0]["version"]), rows
 
-    # 校验菜品在售
-    dish_res = await db.execute(select(Dish).where(Dish.id == dish_id))
-    dish = dish_res.scalar_one_or_none()
-    if not dish or dish.status != "on_sale":
-        raise ValueError("dish_not_available")
+async def empty_cart(db: AsyncSession, cart_id: int) -> None:
+    """删除全部明细并 version+1；不提交（由调用方的事务提交）。"""
+    await db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+    await db.execute(
+        update(Cart).where(Cart.id == cart_id).values(version=Cart.version + 1, updated_at=datetime.utcnow())
+    )
 
-    items_res = await db.execute(select(CartItem).where(CartItem.cart_id == cart.id, CartItem.dish_id == dish_id))
-    items = list(items_res.scalars().all())
-    skey = _spec_key(selected_specs)
+async def add_to_cart(db: AsyncSession, user_id: int, dish_id: int, quantity: int, selected_specs: dict) -> None:
+    if int(quantity) <= 0:
+        raise ValueError("invalid_quantity")
 
-    for it in items:
-        if _spec_key(it.selected_specs or {}) == skey:
-            it.quantity = int(it.quantity) + int(quantity)
-            db.add(it)
-            await db.commit()
-            return
+    # 单条语句：购物车 upsert（CTE）→ 菜品在售校验（JOIN）→ 明细 upsert（同规格数量累加）
+    # 并发加购由唯一索引串行化，不会出现同规格两行
+    now = datetime.utcnow()
+    cart_cte = (
+        pg_insert(Cart)
+        .values(user_id=user_id, updated_at=now, version=1)
+        .on_conflict_do_update(index_elements=[Cart.user_id], set_={"updated_at": now, "version": Cart.version + 1})
+        .returning(Cart.id)
+        .cte("cart")
+    )
+    specs = bindparam("specs", selected_specs or {}, type_=JSONB)
+    src = select(
+        cart_cte.c.id, Dish.id, literal(int(quantity), Integer), specs, _spec_key(specs),
+    ).where(Dish.id == dish_id, Dish.status == "on_sale")
+    stmt = pg_insert(CartItem).from_select(
+        ["cart_id", "dish_id", "quantity", "selected_specs", "spec_key"], src,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.dish_id, CartItem.spec_key],
+        set_={"quantity": CartItem.quantity + stmt.excluded.quantity},
+    ).returning(CartItem.id)
 
-    db.add(CartItem(cart_id=cart.id, dish_id=dish_id, quantity=quantity, selected_specs=selected_specs or {}))
+    res = await db.execute(stmt)
+    if res.scalar_one_or_none() is None:
+        await db.rollback()
+        raise ValueError("dish_not_available")
     await db.commit()
 
+async def _set_item_specs(db: AsyncSession, cart_id: int, it: CartItem, selected_specs: dict) -> None:
+    specs = bindparam("specs", selected_specs, type_=JSONB)
+    # 改规格后与同菜品的另一行同键：数量并入那一行，本行删除（保持唯一键）
+    dup_res = await db.execute(select(CartItem).where(
+        CartItem.cart_id == cart_id,
+        CartItem.dish_id == it.dish_id,
+        CartItem.spec_key == _spec_key(specs),
+        CartItem.id != it.id,
+    ))
+    dup = dup_res.scalar_one_or_none()
+    if dup:
+        dup.quantity = int(dup.quantity) + int(it.quantity)
+        db.add(dup)
+        await db.delete(it)
+        return
+    it.selected_specs = selected_specs
+    it.spec_key = _spec_key(specs)
+    db.add(it)
+
 async def update_cart_item(db: AsyncSession, user_id: int, item_id: int, quantity: int | None, selected_specs: dict | None) -> None:
-    cart = await get_or_create_cart(db, user_id)
+    cart = await _get_cart(db, user_id)
+    if not cart:
+        raise ValueError("cart_item_not_found")
     res = await db.execute(select(CartItem).where(CartItem.id == item_id, CartItem.cart_id == cart.id))
     it = res.scalar_one_or_none()
     if not it:
@@ -82,15 +160,137 @@ async def update_cart_item(db: AsyncSession, user_id: int, item_id: int, quantit
     if quantity is not None:
         it.quantity = int(quantity)
     if selected_specs is not None:
-        it.selected_specs = selected_specs
-    db.add(it)
+        await _set_item_specs(db, cart.id, it, selected_specs)
+    else:
+        db.add(it)
+    _touch(cart)
     await db.commit()
 
 async def delete_cart_item(db: AsyncSession, user_id: int, item_id: int) -> None:
-    cart = await get_or_create_cart(db, user_id)
+    cart = await _get_cart(db, user_id)
+    if not cart:
+        raise ValueError("cart_item_not_found")
     res = await db.execute(select(CartItem).where(CartItem.id == item_id, CartItem.cart_id == cart.id))
     it = res.scalar_one_or_none()
     if not it:
         raise ValueError("cart_item_not_found")
     await db.delete(it)
+    _touch(cart)
+    await db.commit()
+
+async def apply_cart_ops(db: AsyncSession, user_id: int, ops: list[dict], expected_version: int | None = None) -> int:
+    """
+    PATCH /cart：一批 add/update/remove/clear 在一个事务里完成，返回新版本号。
+    固定决策：
+    - 先 upsert 购物车行并 version+1（同时锁住该行，同一用户的并发批量写串行化）
+    - 最后一个 clear 之前的操作全部作废；其余按 remove → update → add 分组，各用一条语句执行
+    - update 的 quantity=0 等同 remove；同一 item 被 remove 后不能再 update
+    - 同菜同规格的多个 add 在 SQL 里按 (dish_id, jsonb 规格) 分组求和，再与已有行 ON CONFLICT 累加；
+      与 spec_key 同一套 jsonb 规范化，同一条 INSERT 不会两次命中同一冲突行
+    - 改规格逐项处理并逐项 flush：同一批里两个 item 改到同一个规格时，后一个能看到前一个的结果并合并
+    - 任一操作失败整批回滚（ValueError）
+    """
+    adds: list[tuple[int, int, dict]] = []
+    removes: set[int] = set()
+    qty_updates: dict[int, int] = {}
+    spec_updates: dict[int, dict] = {}
+
+    last_clear = max((i for i, op in enumerate(ops) if op["op"] == "clear"), default=-1)
+    for op in ops[last_clear + 1:]:
+        kind = op["op"]
+        if kind == "add":
+            if op.get("dish_id") is None or not op.get("quantity"):
+                raise ValueError("invalid_cart_op")
+            adds.append((int(op["dish_id"]), int(op["quantity"]), op.get("selected_specs") or {}))
+            continue
+
+        if op.get("item_id") is None:
+            raise ValueError("invalid_cart_op")
+        item_id = int(op["item_id"])
+        if item_id in removes:
+            raise ValueError("cart_item_not_found")
+        if kind == "remove" or op.get("quantity") == 0:
+            removes.add(item_id)
+            qty_updates.pop(item_id, None)
+            spec_updates.pop(item_id, None)
+            continue
+        if op.get("quantity") is not None:
+            qty_updates[item_id] = int(op["quantity"])
+        if op.get("selected_specs") is not None:
+            spec_updates[item_id] = op["selected_specs"]
+
+    now = datetime.utcnow()
+    res = await db.execute(
+        pg_insert(Cart)
+        .values(user_id=user_id, updated_at=now, version=1)
+        .on_conflict_do_update(index_elements=[Cart.user_id], set_={"updated_at": now, "version": Cart.version + 1})
+        .returning(Cart.id, Cart.version)
+    )
+    cart_id, version = res.one()
+    try:
+        if expected_version is not None and int(version) - 1 != int(expected_version):
+            raise ValueError("cart_version_conflict")
+
+        if last_clear >= 0:
+            await db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+
+        if removes:
+            res = await db.execute(
+                delete(CartItem).where(CartItem.cart_id == cart_id, CartItem.id.in_(removes)).returning(CartItem.id)
+            )
+            if len(res.all()) != len(removes):
+                raise ValueError("cart_item_not_found")
+
+        if qty_updates:
+            v = values(column("id", BigInteger), column("quantity", Integer), name="v").data(list(qty_updates.items()))
+            res = await db.execute(
+                update(CartItem)
+                .where(CartItem.cart_id == cart_id, CartItem.id == v.c.id)
+                .values(quantity=v.c.quantity)
+                .returning(CartItem.id)
+            )
+            if len(res.all()) != len(qty_updates):
+                raise ValueError("cart_item_not_found")
+
+        if spec_updates:
+            # 改规格可能触发合并，逐项处理（少见操作）
+            res = await db.execute(select(CartItem).where(CartItem.cart_id == cart_id, CartItem.id.in_(spec_updates)))
+            items = {int(it.id): it for it in res.scalars().all()}
+            if len(items) != len(spec_updates):
+                raise ValueError("cart_item_not_found")
+            for item_id, specs in spec_updates.items():
+                await _set_item_specs(db, cart_id, items[item_id], specs)
+                await db.flush()
+
+        if adds:
+            v = values(
+                column("dish_id", BigInteger), column("quantity", Integer), column("specs", JSONB), name="a",
+            ).data(adds)
+            # jsonb 相等即 spec_key 相等：按 (dish_id, specs) 分组后每个冲突键只出现一次
+            specs = cast(v.c.specs, JSONB)
+            g = (
+                select(v.c.dish_id, cast(func.sum(v.c.quantity), Integer).label("quantity"), specs.label("specs"))
+                .group_by(v.c.dish_id, specs)
+                .subquery("g")
+            )
+            src = (
+                select(literal(cart_id, BigInteger), g.c.dish_id, g.c.quantity, g.c.specs, _spec_key(g.c.specs))
+                .join_from(g, Dish, Dish.id == g.c.dish_id)
+                .where(Dish.status == "on_sale")
+            )
+            stmt = pg_insert(CartItem).from_select(
+                ["cart_id", "dish_id", "quantity", "selected_specs", "spec_key"], src,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CartItem.cart_id, CartItem.dish_id, CartItem.spec_key],
+                set_={"quantity": CartItem.quantity + stmt.excluded.quantity},
+            ).returning(CartItem.dish_id)
+            res = await db.execute(stmt)
+            if {int(r[0]) for r in res.all()} != {dish_id for dish_id, _, _ in adds}:
+                raise ValueError("dish_not_available")
+    except ValueError:
+        await db.rollback()
+        raise
+
     await db.commit()
+    return int(version)
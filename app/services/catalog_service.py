@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.invalidation import invalidation_bus, publish_change
+from app.db.session import primary_of
+from app.models.dish import Category, Dish, DishSpec
+from app.services.dish_index import AttributeIndex
+from app.services.dish_meta import SEARCH_FIELD_WEIGHTS, compress_candidate, search_fields
+from app.services.search.bm25 import BM25Index
+from app.services.search.suggest import SuggestIndex
+
+
+# -----------------------------
+# 进程内菜单快照（固定决策）
+# -----------------------------
+# - 菜单（分类/菜品/规格）一天只改几次，但首页推荐、AI 候选每次请求都要全量在售菜
+# - 因此每个 worker 持有一份只读快照，带单调递增的 catalog version
+# - 管理端写操作 bump version；下一次读取时懒加载重建
+# - 多 worker 之间通过 invalidation_bus（app/core/invalidation.py）广播 {entity, id, version}，只重载被改动的行
+# - 销量/评分由下单、评价增量更新，不 bump version，靠 TTL 兜底刷新
+
+
+@dataclass(slots=True)
+class DishRow:
+    id: int
+    category_id: int | None
+    name: str
+    description: str | None
+    price: float
+    image_url: str | None
+    status: str
+    ai_metadata: dict
+    ai_highlights: list[str]
+    sales_count: int
+    rating_avg: float
+    rating_count: int
+    # AI 候选压缩载荷（只读，加载时预计算）
+    candidate: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class CategoryRow:
+    id: int
+    name: str
+    sort_order: int
+
+
+@dataclass(slots=True)
+class DishSpecRow:
+    id: int
+    dish_id: int
+    spec_name: str
+    spec_values: list
+
+
+@dataclass(slots=True)
+class CatalogSnapshot:
+    version: int
+    loaded_at: float
+    dishes: dict[int, DishRow] = field(default_factory=dict)
+    on_sale: list[DishRow] = field(default_factory=list)
+    categories: list[CategoryRow] = field(default_factory=list)
+    specs: dict[int, list[DishSpecRow]] = field(default_factory=dict)
+    index: AttributeIndex = field(default_factory=lambda: AttributeIndex([]))
+    # 全部菜品（含非在售）的 BM25 文本索引；增量补丁时先复制再改（写时复制）
+    search: BM25Index = field(default_factory=lambda: BM25Index(SEARCH_FIELD_WEIGHTS))
+    # 在售菜名/分类名的前缀联想索引；同样写时复制
+    suggest: SuggestIndex = field(default_factory=SuggestIndex)
+    # 内容指纹（catalog version + 全部行的摘要），用于 HTTP ETag；同样的数据在各 worker 上得到同样的值
+    etag: str = ""
+
+    def compute_etag(self) -> str:
+        h = hashlib.blake2b(digest_size=8)
+        for dish_id in sorted(self.dishes):
+            d = self.dishes[dish_id]
+            h.update(repr((
+                d.id, d.category_id, d.name, d.description, d.price, d.image_url, d.status,
+                d.ai_metadata, d.ai_highlights, d.sales_count, d.rating_avg, d.rating_count,
+            )).encode())
+        for c in self.categories:
+            h.update(repr((c.id, c.name, c.sort_order)).encode())
+        for dish_id in sorted(self.specs):
+            for sp in self.specs[dish_id]:
+                h.update(repr((sp.id, sp.dish_id, sp.spec_name, sp.spec_values)).encode())
+        return f"{self.version:x}-{h.hexdigest()}"
+
+
+class CatalogCache:
+    def __init__(self, ttl_s: float):
+        self.ttl_s = float(ttl_s)
+        self._version = 0
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = asyncio.Lock()
+        # 定向失效：只重载被改动的菜品/分类；None 表示需要全量重建
+        self._dirty_dishes: set[int] = set()
+        self._dirty_categories = False
+        self._dirty_all = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _next_version(self, floor: int = 0) -> int:
+        # 固定决策：version 只增不减；取微秒时间戳，多个 worker 收到同一事件后能收敛到同一 version
+        self._version = max(self._version + 1, time.time_ns() // 1000, int(floor))
+        return self._version
+
+    def bump(self) -> int:
+        self._dirty_all = True
+        return self._next_version()
+
+    def invalidate(self, entity: str, entity_id: int | None = None, version: int | None = None) -> int:
+        """
+        应用一条失效事件（本 worker 写入或其它 worker 广播）：
+        - dish + id：只重载该菜品及其规格
+        - category：重载分类列表
+        - 其它/缺 id：全量重建
+        """
+        if entity == "dish" and entity_id is not None:
+            self._dirty_dishes.add(int(entity_id))
+        elif entity == "category":
+            self._dirty_categories = True
+        else:
+            self._dirty_all = True
+
+        if version is not None and int(version) <= self._version:
+            # 事件回声或乱序到达：脏标记已足够触发重载，version 不回退
+            return self._version
+        if version is not None:
+            self._version = int(version)
+            return self._version
+        return self._next_version()
+
+    def _is_fresh(self, snap: CatalogSnapshot | None) -> bool:
+        if snap is None or self._dirty_all:
+            return False
+        if self._dirty_dishes or self._dirty_categories:
+            return False
+        if snap.version != self._version:
+            return False
+        return (time.monotonic() - snap.loaded_at) < self.ttl_s
+
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        snap = self._snapshot
+        if self._is_fresh(snap):
+            return snap
+        async with self._lock:
+            # 拿到锁后再判断一次，避免并发请求重复加载
+            snap = self._snapshot
+            if self._is_fresh(snap):
+                return snap
+
+            # 重载一律读主库：副本可能还没追上刚广播的写入，读到旧行会以新 version 缓存下来
+            db = primary_of(db)
+            # 先取走脏标记并记录 version 再查库：加载过程中若有新事件，会在下次读取时再处理
+            version = self._version
+            dirty_dishes, self._dirty_dishes = self._dirty_dishes, set()
+            dirty_categories, self._dirty_categories = self._dirty_categories, False
+            dirty_all, self._dirty_all = self._dirty_all, False
+            expired = snap is None or (time.monotonic() - snap.loaded_at) >= self.ttl_s
+
+            try:
+                if dirty_all or expired:
+                    snap = await self._load(db, version)
+                else:
+                    snap = await self._patch(db, snap, version, dirty_dishes, dirty_categories)
+            except Exception:
+                self._dirty_dishes |= dirty_dishes
+                self._dirty_categories = self._dirty_categories or dirty_categories
+                self._dirty_all = self._dirty_all or dirty_all
+                raise
+            self._snapshot = snap
+            return snap
+
+    @staticmethod
+    def _dish_row(r) -> DishRow:
+        d = DishRow(
+            id=int(r.id),
+            category_id=int(r.category_id) if r.category_id is not None else None,
+            name=r.name,
+            description=r.description,
+            price=float(r.price),
+            image_url=r.image_url,
+            status=r.status,
+            ai_metadata=r.ai_metadata or {},
+            ai_highlights=list(r.ai_highlights or []),
+            sales_count=int(r.sales_count or 0),
+            rating_avg=float(r.rating_avg or 0),
+            rating_count=int(r.rating_count or 0),
+        )
+        d.candidate = compress_candidate(
+            d.id, d.name, d.price, d.ai_metadata, d.ai_highlights, d.rating_avg, d.sales_count
+        )
+        return d
+
+    @staticmethod
+    def _dish_columns():
+        return select(
+            Dish.id, Dish.category_id, Dish.name, Dish.description, Dish.price, Dish.image_url,
+            Dish.status, Dish.ai_metadata, Dish.ai_highlights, Dish.sales_count, Dish.rating_avg,
+            Dish.rating_count,
+        )
+
+    @staticmethod
+    async def _load_categories(db: AsyncSession) -> list[CategoryRow]:
+        cat_res = await db.execute(
+            select(Category.id, Category.name, Category.sort_order)
+            .order_by(Category.sort_order.asc(), Category.id.asc())
+        )
+        return [CategoryRow(id=int(c.id), name=c.name, sort_order=int(c.sort_order or 0)) for c in cat_res.all()]
+
+    @staticmethod
+    def _suggest_categories(snap: CatalogSnapshot) -> None:
+        # 分类权重 = 分类下在售菜销量之和；分类数很少，整体重建
+        sales: dict[int, int] = {}
+        for d in snap.on_sale:
+            if d.category_id is not None:
+                sales[d.category_id] = sales.get(d.category_id, 0) + d.sales_count
+        snap.suggest.remove_kind("category")
+        for c in snap.categories:
+            snap.suggest.add("category", c.id, c.name, sales.get(c.id, 0))
+
+    async def _load(self, db: AsyncSession, version: int) -> CatalogSnapshot:
+        snap = CatalogSnapshot(version=version, loaded_at=time.monotonic())
+
+        dish_res = await db.execute(self._dish_columns().order_by(Dish.id.asc()))
+        for r in dish_res.all():
+            d = self._dish_row(r)
+            snap.dishes[d.id] = d
+            snap.search.add(d.id, search_fields(d.name, d.description, d.ai_metadata))
+            if d.status == "on_sale":
+                snap.on_sale.append(d)
+                snap.suggest.add("dish", d.id, d.name, d.sales_count)
+
+        snap.categories = await self._load_categories(db)
+        self._suggest_categories(snap)
+
+        spec_res = await db.execute(
+            select(DishSpec.id, DishSpec.dish_id, DishSpec.spec_name, DishSpec.spec_values)
+            .order_by(DishSpec.dish_id.asc(), DishSpec.id.asc())
+        )
+        for s in spec_res.all():
+            row = DishSpecRow(id=int(s.id), dish_id=int(s.dish_id), spec_name=s.spec_name, spec_values=s.spec_values or [])
+            snap.specs.setdefault(row.dish_id, []).append(row)
+        snap.index = AttributeIndex(snap.on_sale)
+        snap.etag = snap.compute_etag()
+        return snap
+
+    async def _patch(
+        self,
+        db: AsyncSession,
+        base: CatalogSnapshot,
+        version: int,
+        dish_ids: set[int],
+        categories: bool,
+    ) -> CatalogSnapshot:
+        # 写时复制：读者手里的旧快照保持不变（可变的文本/联想索引复制后再改）
+        snap = CatalogSnapshot(
+            version=version,
+            loaded_at=base.loaded_at,
+            dishes=dict(base.dishes),
+            on_sale=base.on_sale,
+            categories=base.categories,
+            specs=dict(base.specs),
+            index=base.index,
+            search=base.search.clone() if dish_ids else base.search,
+            suggest=base.suggest.clone() if (dish_ids or categories) else base.suggest,
+        )
+
+        if dish_ids:
+            ids = sorted(dish_ids)
+            dish_res = await db.execute(self._dish_columns().where(Dish.id.in_(ids)))
+            rows = dish_res.all()
+            for did in ids:
+                snap.dishes.pop(did, None)
+                snap.specs.pop(did, None)
+                snap.search.remove(did)
+                snap.suggest.remove("dish", did)
+            for r in rows:
+                d = self._dish_row(r)
+                snap.dishes[d.id] = d
+                snap.search.add(d.id, search_fields(d.name, d.description, d.ai_metadata))
+                if d.status == "on_sale":
+                    snap.suggest.add("dish", d.id, d.name, d.sales_count)
+            spec_res = await db.execute(
+                select(DishSpec.id, DishSpec.dish_id, DishSpec.spec_name, DishSpec.spec_values)
+                .where(DishSpec.dish_id.in_(ids))
+                .order_by(DishSpec.dish_id.asc(), DishSpec.id.asc())
+            )
+            for s in spec_res.all():
+                row = DishSpecRow(id=int(s.id), dish_id=int(s.dish_id), spec_name=s.spec_name, spec_values=s.spec_values or [])
+                snap.specs.setdefault(row.dish_id, []).append(row)
+            snap.on_sale = [d for _, d in sorted(snap.dishes.items()) if d.status == "on_sale"]
+            snap.index = AttributeIndex(snap.on_sale)
+
+        if categories:
+            snap.categories = await self._load_categories(db)
+        if dish_ids or categories:
+            self._suggest_categories(snap)
+        snap.etag = snap.compute_etag()
+        return snap
+
+
+catalog_cache = CatalogCache(ttl_s=settings.CATALOG_TTL_SECONDS)
+
+
+def bump_catalog_version() -> int:
+    return catalog_cache.bump()
+
+
+async def get_catalog(db: AsyncSession) -> CatalogSnapshot:
+    return await catalog_cache.get(db)
+
+
+def _apply_catalog_event(event: dict) -> None:
+    entity = str(event.get("entity") or "*")
+    if entity not in {"dish", "category", "*"}:
+        return
+    entity_id = event.get("id")
+    catalog_cache.invalidate(
+        entity,
+        int(entity_id) if entity_id is not None else None,
+        int(event["version"]) if event.get("version") is not None else None,
+    )
+
+
+invalidation_bus.subscribe(_apply_catalog_event)
+
+
+async def publish_catalog_change(entity: str, entity_id: int | None) -> int:
+    """管理端菜单写入提交后调用：bump 本 worker 的 catalog version 并广播。"""
+    version = catalog_cache.invalidate(entity, entity_id)
+    await publish_change(entity, entity_id, version)
+    return version
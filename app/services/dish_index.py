@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.services.catalog_service import DishRow
+
+
+# -----------------------------
+# 在售菜结构化属性索引 + 稠密特征矩阵（固定决策）
+# -----------------------------
+# - 随菜单快照一起构建，菜单变更即重建；请求路径只做向量运算
+# - 第 i 行对应 on_sale[i]
+# - X：数值特征（评分/销量/口味等级/饮食标记），按列存储；缺失的口味等级为 NaN（任何比较都为 False）
+# - term_rows：食材/过敏源（小写）→ 行号数组；忌口排除只触达命中的行，不扫描整张矩阵
+# - 打分规则都是对整列的向量表达式，top-k 用 argpartition，不做全量排序
+
+FEATURES = ("rating", "sales", "spicy", "light", "greasy", "high_protein", "low_carb", "shrimp")
+COL = {name: i for i, name in enumerate(FEATURES)}
+
+# 餐段 → ai_metadata.scenes 里可能出现的写法
+SCENE_ALIASES = {
+    "breakfast": {"breakfast", "早餐", "早饭"},
+    "lunch": {"lunch", "午餐", "午饭"},
+    "dinner": {"dinner", "晚餐", "晚饭"},
+    "late_night": {"late_night", "夜宵", "宵夜"},
+}
+
+
+def _num(v) -> float:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+
+
+class AttributeIndex:
+    def __init__(self, dishes: list["DishRow"]):
+        self.rows = dishes
+        self.size = n = len(dishes)
+        self.ids = np.fromiter((d.id for d in dishes), dtype=np.int64, count=n)
+        self.pos = {d.id: i for i, d in enumerate(dishes)}
+
+        X = np.zeros((n, len(FEATURES)), dtype=np.float64, order="F")
+        term_rows: dict[str, list[int]] = {}
+        self.scene: dict[str, np.ndarray] = {b: np.zeros(n, dtype=bool) for b in SCENE_ALIASES}
+        # 只含食材（不含过敏源）的词，用于“用户提到了这道菜的食材”
+        ingredient_terms: set[str] = set()
+
+        for i, d in enumerate(dishes):
+            meta = d.ai_metadata or {}
+            ingredients = [str(x).lower() for x in (meta.get("ingredients") or [])]
+            allergens = [str(x).lower() for x in (meta.get("allergens") or [])]
+            for w in set(ingredients) | set(allergens):
+                term_rows.setdefault(w, []).append(i)
+            ingredient_terms.update(ingredients)
+
+            scenes = meta.get("scenes") or meta.get("scene") or []
+            scenes = {str(x).lower() for x in (scenes if isinstance(scenes, list) else [scenes])}
+            for bucket, aliases in SCENE_ALIASES.items():
+                if scenes & aliases:
+                    self.scene[bucket][i] = True
+
+            taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
+            diet = meta.get("diet", {}) if isinstance(meta.get("diet", {}), dict) else {}
+            X[i, COL["rating"]] = float(d.rating_avg)
+            X[i, COL["sales"]] = float(d.sales_count)
+            X[i, COL["spicy"]] = _num(taste.get("spicy"))
+            X[i, COL["light"]] = _num(taste.get("light"))
+            X[i, COL["greasy"]] = _num(taste.get("greasy"))
+            X[i, COL["high_protein"]] = 1.0 if diet.get("high_protein") is True else 0.0
+            X[i, COL["low_carb"]] = 1.0 if diet.get("low_carb") is True else 0.0
+            shrimp = "虾" in (d.name or "").lower() or any("shrimp" in w for w in ingredients)
+            X[i, COL["shrimp"]] = 1.0 if shrimp else 0.0
+
+        self.X = X
+        self.term_rows = {w: np.asarray(rows, dtype=np.int64) for w, rows in term_rows.items()}
+        self.ingredient_terms = sorted(ingredient_terms)
+
+        # 常用的布尔列（预先算好，请求路径直接复用）
+        spicy, light = X[:, COL["spicy"]], X[:, COL["light"]]
+        with np.errstate(invalid="ignore"):
+            self.is_light = light >= 3
+            self.is_mild = spicy <= 1
+        self.is_light_or_mild = self.is_light | self.is_mild
+        self.is_high_protein = X[:, COL["high_protein"]] > 0
+        self.is_shrimp = X[:, COL["shrimp"]] > 0
+        # 业务层派生的常量向量（如基础分），按 key 缓存，随索引一起失效
+        self._derived: dict[str, np.ndarray] = {}
+
+    def col(self, name: str) -> np.ndarray:
+        return self.X[:, COL[name]]
+
+    def derived(self, key: str, build) -> np.ndarray:
+        vec = self._derived.get(key)
+        if vec is None:
+            vec = self._derived[key] = build(self)
+        return vec
+
+    def _rows(self, terms: Iterable[str]) -> np.ndarray:
+        hits = [self.term_rows[w] for w in terms if w in self.term_rows]
+        if not hits:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits)) if len(hits) > 1 else hits[0]
+
+    def restricted_rows(self, restrictions: Iterable[str]) -> np.ndarray:
+        # 固定决策：restrictions 同时匹配 ingredients/allergens 任意即排除（整词匹配，大小写不敏感）
+        return self._rows({str(r).lower() for r in restrictions})
+
+    def mentioned_ingredient_rows(self, text: str) -> np.ndarray:
+        # 用户输入提到了食材（或输入本身是食材词的一部分，如“虾”→“虾仁”）→ 含该食材的菜
+        # 遍历的是食材词表而不是菜品，菜单变大时成本基本不变
+        text = (text or "").lower()
+        if not text:
+            return np.zeros(0, dtype=np.int64)
+        return self._rows(w for w in self.ingredient_terms if w and (w in text or text in w))
+
+    def dense(self, sparse: dict[int, float]) -> np.ndarray:
+        """{dish_id: value} → 与行对齐的稠密向量（缺失为 0）。"""
+        out = np.zeros(self.size, dtype=np.float64)
+        pos = self.pos
+        for dish_id, v in sparse.items():
+            i = pos.get(dish_id)
+            if i is not None:
+                out[i] = v
+        return out
+
+    def top_k(self, scores: np.ndarray, k: int) -> list["DishRow"]:
+        """取分数最高的 k 行（-inf 视为已排除）；同分按 id 升序。"""
+        order = top_k_positions(scores, k, self.ids)
+        rows = self.rows
+        return [rows[i] for i in order]
+
+
+def top_k_positions(scores: np.ndarray, k: int, ids: np.ndarray) -> np.ndarray:
+    n = scores.size
+    k = min(int(k), n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        part = np.argpartition(scores, n - k)[n - k:]
+        kth = scores[part].min()
+        if np.isfinite(kth):
+            # 门槛上的并列项全部保留，再按 (分数降序, id 升序) 截断，结果稳定
+            cand = np.flatnonzero(scores >= kth)
+        else:
+            cand = part[np.isfinite(scores[part])]
+    else:
+        cand = np.flatnonzero(np.isfinite(scores))
+    return cand[np.lexsort((ids[cand], -scores[cand]))][:k]
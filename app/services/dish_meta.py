@@ -0,0 +1,109 @@
+# -----------------------------
+# 菜品元数据派生字段（写时计算）
+# -----------------------------
+# - ai_highlights：写入 dishes.ai_highlights 列（管理端新增/修改时计算，存量数据用回填脚本）
+# - candidate：AI 候选压缩载荷，菜单快照加载时计算一次，请求路径只查表
+
+
+def compute_highlights(ai_metadata: dict) -> list[str]:
+    meta = ai_metadata or {}
+    taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
+    ingredients = meta.get("ingredients", []) if isinstance(meta.get("ingredients", []), list) else []
+    temp = meta.get("temperature")
+
+    highlights: list[str] = []
+
+    spicy = taste.get("spicy")
+    greasy = taste.get("greasy")
+    light = taste.get("light")
+
+    if isinstance(light, (int, float)) and light >= 3:
+        highlights.append("清淡")
+    elif isinstance(greasy, (int, float)) and greasy >= 4:
+        highlights.append("重口")
+
+    if isinstance(spicy, (int, float)):
+        if spicy == 0:
+            highlights.append("不辣")
+        elif spicy >= 4:
+            highlights.append("很辣")
+
+    if temp == "hot":
+        highlights.append("热菜")
+    elif temp == "cold":
+        highlights.append("冷菜")
+
+    # 常见食材徽章（固定决策：仅展示少量）
+    if any(x in ingredients for x in ["shrimp", "虾", "虾仁"]):
+        highlights.append("含虾")
+    if any(x in ingredients for x in ["beef", "牛肉"]):
+        highlights.append("牛肉")
+    if any(x in ingredients for x in ["chicken", "鸡肉"]):
+        highlights.append("鸡肉")
+
+    # diet / scenes
+    diet = meta.get("diet", {}) if isinstance(meta.get("diet", {}), dict) else {}
+    if diet.get("high_protein") is True:
+        highlights.append("高蛋白")
+    if diet.get("low_carb") is True:
+        highlights.append("低碳水")
+
+    # 去重并限制长度
+    dedup = []
+    for h in highlights:
+        if h not in dedup:
+            dedup.append(h)
+    return dedup[:5]
+
+
+CANDIDATE_FALLBACK_REASON = ["在售", "口碑与热销靠前", "与你的表达更匹配"]
+
+
+def compress_candidate(
+    dish_id: int,
+    name: str,
+    price: float,
+    ai_metadata: dict,
+    ai_highlights: list[str],
+    rating_avg: float,
+    sales_count: int,
+) -> dict:
+    # 固定决策：候选载荷只保留 AI 决策需要的字段，避免 token 浪费
+    meta = ai_metadata or {}
+    taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
+    ingredients = meta.get("ingredients", []) if isinstance(meta.get("ingredients", []), list) else []
+    return {
+        "id": int(dish_id),
+        "name": name,
+        "price": float(price),
+        "meta": {
+            "taste": {k: taste.get(k) for k in ["spicy","sweet","sour","numbing","greasy","light"]},
+            "temperature": meta.get("temperature"),
+            "ingredients": ingredients[:10],
+            "allergens": (meta.get("allergens") or [])[:10],
+            "diet": meta.get("diet", {}),
+            "scenes": meta.get("scenes", []),
+            "highlights": list(ai_highlights or []),
+            "rating": float(rating_avg),
+            "sales": int(sales_count),
+            "fallback_reason": CANDIDATE_FALLBACK_REASON,
+        }
+    }
+
+
+# 固定决策：文本检索字段与权重（菜名最重要，其次食材）
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "ingredients": 2.0, "scenes": 1.0, "description": 1.0}
+
+
+def search_fields(name: str, description: str | None, ai_metadata: dict) -> dict[str, str]:
+    meta = ai_metadata or {}
+    ingredients = meta.get("ingredients", []) if isinstance(meta.get("ingredients", []), list) else []
+    scenes = meta.get("scenes") or meta.get("scene") or []
+    if not isinstance(scenes, list):
+        scenes = [scenes]
+    return {
+        "name": name or "",
+        "ingredients": " ".join(str(x) for x in ingredients),
+        "scenes": " ".join(str(x) for x in scenes),
+        "description": description or "",
+    }
@@ -1,73 +1,265 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, func, literal, literal_column, or_, select, tuple_
+from app.core.config import settings
 from app.models.dish import Dish, DishSpec
+from app.services.catalog_service import CatalogSnapshot, DishRow, get_catalog
+from app.services.dish_index import AttributeIndex
+
+# -----------------------------
+# 菜品列表分页（固定决策）
+# -----------------------------
+# - keyset 分页：按 (排序键, id) 翻页，cursor 是上一页最后一行的 (排序键, id)，不用 OFFSET
+# - 排序方向：id/price 升序，sales/rating 降序；id 作为同方向的并列裁决，保证顺序全序且稳定
+# - 列表只查 DishListItem 需要的列（不取 description / ai_metadata）
+# - total 默认不算（需要时 include_total=true 额外 count 一次）
+# - 关键词检索默认按相关度排序，cursor 为 (相关度, id)，契约与列表一致
+# - 默认模式（bm25）的列表与检索都只读进程内菜单快照：响应完全由快照决定，
+#   路由可以用快照指纹做 ETag / 字节缓存
+# - mode=fuzzy 时检索下推到 Postgres（pg_trgm），按相似度排序，同样的分页契约；读的是实时行，不进快照缓存
+
+DISH_LIST_LIMIT_DEFAULT = 20
+DISH_LIST_LIMIT_MAX = 100
+
+# sort → (列, 快照行属性, 是否降序)
+DISH_SORTS = {
+    "id": (Dish.id, "id", False),
+    "sales": (Dish.sales_count, "sales_count", True),
+    "rating": (Dish.rating_avg, "rating_avg", True),
+    "price": (Dish.price, "price", False),
+}
+RELEVANCE_SORT = "relevance"
+
+# 关键词检索模式：bm25 = 进程内相关度排序（默认）；fuzzy = 库内 pg_trgm 相似度，容错别字
+SEARCH_MODES = ("bm25", "fuzzy")
+# 必须与 init.sql / migrations/003 中 GIN 表达式索引逐字一致（不能用绑定参数），否则用不上索引
+TRGM_DOCUMENT = literal_column("(dishes.name || ' ' || coalesce(dishes.description, ''))")
+
+
+def _list_columns():
+    return select(
+        Dish.id, Dish.name, Dish.price, Dish.image_url, Dish.status,
+        Dish.rating_avg, Dish.rating_count, Dish.sales_count, Dish.ai_highlights,
+    )
+
+
+def encode_cursor(sort: str, key, dish_id: int) -> str:
+    if isinstance(key, Decimal):
+        key = str(key)
+    raw = json.dumps([sort, key, int(dish_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[object, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cur_sort, key, dish_id = json.loads(raw)
+        if cur_sort != sort or isinstance(key, (list, dict)) or key is None:
+            raise ValueError
+        return key, int(dish_id)
+    except (ValueError, TypeError):
+        raise ValueError("invalid_cursor")
+
+
+def _db_key(sort: str, key):
+    # Numeric 列用 Decimal 比较，避免浮点误差把边界行漏掉/重复
+    if sort in {"price", "rating"}:
+        try:
+            return Decimal(str(key))
+        except InvalidOperation:
+            raise ValueError("invalid_cursor")
+    if isinstance(key, bool) or not isinstance(key, int):
+        raise ValueError("invalid_cursor")
+    return key
+
+
+def is_live_query(keyword: str | None, mode: str) -> bool:
+    """该列表查询是否读库内实时行（而不是菜单快照）；只有 fuzzy 关键词检索会。"""
+    return mode == "fuzzy" and bool((keyword or "").strip())
 
-def compute_highlights(ai_metadata: dict) -> list[str]:
-    meta = ai_metadata or {}
-    taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
-    ingredients = meta.get("ingredients", []) if isinstance(meta.get("ingredients", []), list) else []
-    temp = meta.get("temperature")
-
-    highlights: list[str] = []
-
-    spicy = taste.get("spicy")
-    greasy = taste.get("greasy")
-    light = taste.get("light")
-
-    if isinstance(light, (int, float)) and light >= 3:
-        highlights.append("清淡")
-    elif isinstance(greasy, (int, float)) and greasy >= 4:
-        highlights.append("重口")
-
-    if isinstance(spicy, (int, float)):
-        if spicy == 0:
-            highlights.append("不辣")
-        elif spicy >= 4:
-            highlights.append("很辣")
-
-    if temp == "hot":
-        highlights.append("热菜")
-    elif temp == "cold":
-        highlights.append("冷菜")
-
-    # 常见食材徽章（固定决策：仅展示少量）
-    if any(x in ingredients for x in ["shrimp", "虾", "虾仁"]):
-        highlights.append("含虾")
-    if any(x in ingredients for x in ["beef", "牛肉"]):
-        highlights.append("牛肉")
-    if any(x in ingredients for x in ["chicken", "鸡肉"]):
-        highlights.append("鸡肉")
-
-    # diet / scenes
-    diet = meta.get("diet", {}) if isinstance(meta.get("diet", {}), dict) else {}
-    if diet.get("high_protein") is True:
-        highlights.append("高蛋白")
-    if diet.get("low_carb") is True:
-        highlights.append("低碳水")
-
-    # 去重并限制长度
-    dedup = []
-    for h in highlights:
-        if h not in dedup:
-            dedup.append(h)
-    return dedup[:5]
 
 async def list_dishes(
     db: AsyncSession,
     category_id: int | None,
     keyword: str | None,
     status: str = "on_sale",
-) -> list[Dish]:
-    stmt = select(Dish)
+    sort: str | None = None,
+    limit: int = DISH_LIST_LIMIT_DEFAULT,
+    cursor: str | None = None,
+    include_total: bool = False,
+    mode: str = "bm25",
+    snap: CatalogSnapshot | None = None,
+) -> tuple[list, str | None, int | None]:
+    """
+    返回 (本页行, next_cursor, total)；行只保证具有 DishListItem 的字段。
+    snap：快照路径使用的菜单快照；调用方已按它算了 ETag 时必须传入同一份，保证响应与 ETag 一致。
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError("invalid_search_mode")
+    limit = max(1, min(int(limit), DISH_LIST_LIMIT_MAX))
+    keyword = (keyword or "").strip()
+
+    filters = []
     if status:
-        stmt = stmt.where(Dish.status == status)
+        filters.append(Dish.status == status)
     if category_id is not None:
-        stmt = stmt.where(Dish.category_id == category_id)
+        filters.append(Dish.category_id == category_id)
+
+    if not is_live_query(keyword, mode):
+        if snap is None:
+            snap = await get_catalog(db)
+        return _snapshot_page(snap, keyword, category_id, status, sort, limit, cursor, include_total)
+    if keyword and mode == "fuzzy":
+        # 模糊检索：库内 pg_trgm（GIN 表达式索引）匹配，可容错别字
+        await db.execute(select(func.set_config(
+            "pg_trgm.word_similarity_threshold", str(settings.FUZZY_SEARCH_THRESHOLD), True
+        )))
+        filters.append(_trgm_match(keyword))
+        sort = sort or RELEVANCE_SORT
+        if sort == RELEVANCE_SORT:
+            return await _fuzzy_page(db, keyword, filters, limit, cursor, include_total)
+
+    sort = sort or "id"
+    if sort not in DISH_SORTS:
+        raise ValueError("invalid_sort")
+    col, _, desc = DISH_SORTS[sort]
+
+    stmt = _list_columns().where(*filters)
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort)
+        key = _db_key(sort, key)
+        if sort == "id":
+            stmt = stmt.where(Dish.id > key)
+        elif desc:
+            stmt = stmt.where(tuple_(col, Dish.id) < tuple_(key, last_id))
+        else:
+            stmt = stmt.where(tuple_(col, Dish.id) > tuple_(key, last_id))
+    if sort == "id":
+        stmt = stmt.order_by(Dish.id.asc())
+    elif desc:
+        stmt = stmt.order_by(col.desc(), Dish.id.desc())
+    else:
+        stmt = stmt.order_by(col.asc(), Dish.id.asc())
+    # 多取一行判断是否还有下一页
+    res = await db.execute(stmt.limit(limit + 1))
+    rows = list(res.all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, col.key), last.id)
+
+    total = await _count(db, filters) if include_total else None
+    return rows, next_cursor, total
+
+
+async def _count(db: AsyncSession, filters: list) -> int:
+    return int((await db.execute(select(func.count()).select_from(Dish).where(*filters))).scalar_one())
+
+
+def _trgm_match(keyword: str):
+    # 长词走 word_similarity（<% 运算符，阈值见 FUZZY_SEARCH_THRESHOLD）容错；
+    # 短词（如两个汉字）三元组太少、相似度天然偏低，再用同一索引上的 ILIKE 子串匹配兜底
+    escaped = keyword.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return or_(
+        literal(keyword).op("<%")(TRGM_DOCUMENT),
+        TRGM_DOCUMENT.ilike(literal(f"%{escaped}%"), escape="!"),
+    )
+
+
+async def _fuzzy_page(
+    db: AsyncSession,
+    keyword: str,
+    filters: list,
+    limit: int,
+    cursor: str | None,
+    include_total: bool,
+) -> tuple[list, str | None, int | None]:
+    # 相似度降序、id 升序；cursor 为 (相似度, id)
+    score = func.word_similarity(keyword, TRGM_DOCUMENT)
+    stmt = _list_columns().add_columns(score.label("score")).where(*filters)
+    if cursor:
+        key, last_id = decode_cursor(cursor, RELEVANCE_SORT)
+        if isinstance(key, bool) or not isinstance(key, (int, float)):
+            raise ValueError("invalid_cursor")
+        stmt = stmt.where(or_(score < key, and_(score == key, Dish.id > last_id)))
+    res = await db.execute(stmt.order_by(score.desc(), Dish.id.asc()).limit(limit + 1))
+    rows = list(res.all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(RELEVANCE_SORT, float(rows[-1].score), rows[-1].id)
+
+    total = await _count(db, filters) if include_total else None
+    return rows, next_cursor, total
+
+
+def _snapshot_page(
+    snap: CatalogSnapshot,
+    keyword: str,
+    category_id: int | None,
+    status: str,
+    sort: str | None,
+    limit: int,
+    cursor: str | None,
+    include_total: bool,
+) -> tuple[list[DishRow], str | None, int | None]:
+    # 列表与关键词检索都在进程内快照上完成：关键词走 BM25（按相关度排序），不再 ILIKE 全表扫描
+    sort = sort or (RELEVANCE_SORT if keyword else "id")
+    if sort not in DISH_SORTS and not (keyword and sort == RELEVANCE_SORT):
+        raise ValueError("invalid_sort")
     if keyword:
-        # 固定决策：一期用 ILIKE，避免引入全文检索复杂度
-        stmt = stmt.where(Dish.name.ilike(f"%{keyword}%"))
-    res = await db.execute(stmt)
-    return list(res.scalars().all())
+        hits = ((snap.dishes.get(dish_id), score) for dish_id, score in snap.search.search(keyword, strict=True))
+    else:
+        hits = ((d, 0.0) for d in snap.dishes.values())
+    matched: list[tuple[float, DishRow]] = []
+    for d, score in hits:
+        if d is None:
+            continue
+        if status and d.status != status:
+            continue
+        if category_id is not None and d.category_id != category_id:
+            continue
+        matched.append((float(score), d))
+
+    # 统一成 (排序键, id) + 方向，与数据库路径同一套 keyset 规则
+    if sort == RELEVANCE_SORT:
+        keyed = [((-score, d.id), score, d) for score, d in matched]
+    else:
+        attr, desc = DISH_SORTS[sort][1], DISH_SORTS[sort][2]
+        sign = -1 if desc else 1
+        keyed = [((sign * getattr(d, attr), sign * d.id), getattr(d, attr), d) for _, d in matched]
+    keyed.sort(key=lambda x: x[0])
+
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort)
+        if isinstance(key, bool) or not isinstance(key, (int, float, str)):
+            raise ValueError("invalid_cursor")
+        try:
+            key = float(key)
+        except ValueError:
+            raise ValueError("invalid_cursor")
+        if sort == RELEVANCE_SORT:
+            bound = (-key, last_id)
+        else:
+            sign = -1 if DISH_SORTS[sort][2] else 1
+            bound = (sign * key, sign * last_id)
+        keyed = [x for x in keyed if x[0] > bound]
+
+    total = len(matched) if include_total else None
+    page = keyed[: limit + 1]
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        _, key, d = page[-1]
+        next_cursor = encode_cursor(sort, key, d.id)
+    return [d for _, _, d in page], next_cursor, total
 
 async def get_dish_detail(db: AsyncSession, dish_id: int) -> tuple[Dish | None, list[DishSpec]]:
     dish_res = await db.execute(select(Dish).where(Dish.id == dish_id))
@@ -78,30 +270,87 @@ async def get_dish_detail(db: AsyncSession, dish_id: int) -> tuple[Dish | None,
     specs = list(specs_res.scalars().all())
     return dish, specs
 
-async def recommend_home(db: AsyncSession, user_tags: list[str]) -> list[Dish]:
-    # 固定决策：首页推荐 = 在售菜里按（销量 + 评分）排序，再对“清淡/不辣/高蛋白”类标签微调
-    res = await db.execute(select(Dish).where(Dish.status == "on_sale"))
-    dishes = list(res.scalars().all())
-    tags = set([t.lower() for t in (user_tags or [])])
+async def get_dish_details(db: AsyncSession, dish_ids: list[int]) -> tuple[list[Dish], dict[int, list[DishSpec]]]:
+    """
+    批量详情：菜品、规格各一次 IN 查询（与数量无关，固定两次往返）。
+    返回按请求顺序排列的菜品（去重、跳过不存在的 id）与 dish_id → 规格列表。
+    """
+    ids = list(dict.fromkeys(int(i) for i in dish_ids))
+    if not ids:
+        return [], {}
+    dish_res = await db.execute(select(Dish).where(Dish.id.in_(ids)))
+    by_id = {int(d.id): d for d in dish_res.scalars().all()}
+    dishes = [by_id[i] for i in ids if i in by_id]
+
+    specs: dict[int, list[DishSpec]] = {}
+    if dishes:
+        specs_res = await db.execute(
+            select(DishSpec)
+            .where(DishSpec.dish_id.in_([int(d.id) for d in dishes]))
+            .order_by(DishSpec.dish_id.asc(), DishSpec.id.asc())
+        )
+        for s in specs_res.scalars().all():
+            specs.setdefault(int(s.dish_id), []).append(s)
+    return dishes, specs
+
+# 首页推荐标签 → (特征列, 加分)
+HOME_TAG_BOOSTS = (("light", "is_light", 1.5), ("no_spicy", "is_mild", 1.0), ("high_protein", "is_high_protein", 1.0))
+# 当前餐段与菜品场景一致时的加分
+HOME_SCENE_BOOST = 0.8
+
+
+def _home_base(index: AttributeIndex) -> np.ndarray:
+    return index.col("sales") * 0.0003 + index.col("rating") * 0.4
+
 
-    def score(d: Dish) -> float:
-        s = float(d.sales_count) * 0.0003 + float(d.rating_avg) * 0.4
-        meta = d.ai_metadata or {}
-        taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
-        diet = meta.get("diet", {}) if isinstance(meta.get("diet", {}), dict) else {}
-        spicy = taste.get("spicy", 2)
-        light = taste.get("light", 2)
-
-        if "light" in tags and isinstance(light, (int, float)) and light >= 3:
-            s += 1.5
-        if "no_spicy" in tags and isinstance(spicy, (int, float)) and spicy <= 1:
-            s += 1.0
-        if "high_protein" in tags and diet.get("high_protein") is True:
-            s += 1.0
-        return s
-
-    ranked = sorted(dishes, key=score, reverse=True)
-    return ranked[:20]
+def _home_flags(index: AttributeIndex) -> np.ndarray:
+    return np.vstack([getattr(index, attr) for _, attr, _ in HOME_TAG_BOOSTS]).astype(np.float64)
+
+
+def _candidate_base(index: AttributeIndex) -> np.ndarray:
+    return index.col("rating") * 0.3 + index.col("sales") * 0.0004
+
+
+def home_tag_key(tags: set[str]) -> tuple[str, ...]:
+    """只保留影响首页打分的标签；key 相同的用户排序结果完全一致。"""
+    return tuple(tag for tag, _, _ in HOME_TAG_BOOSTS if tag in tags)
+
+
+def score_home(index: AttributeIndex, tag_sets: list[set[str]], time_bucket: str | None = None) -> np.ndarray:
+    """
+    一次为多个用户打分：返回 (用户数, 在售菜数) 的分数矩阵。
+    固定决策：首页推荐 = 在售菜里按（销量 + 评分）排序，再对“清淡/不辣/高蛋白”类标签、当前餐段微调
+    """
+    base = index.derived("home_base", _home_base)
+    if time_bucket in index.scene:
+        base = base + HOME_SCENE_BOOST * index.scene[time_bucket]
+    flags = index.derived("home_flags", _home_flags)
+    weights = np.array(
+        [[boost if tag in tags else 0.0 for tag, _, boost in HOME_TAG_BOOSTS] for tags in tag_sets],
+        dtype=np.float64,
+    ).reshape(len(tag_sets), len(HOME_TAG_BOOSTS))
+    return base[None, :] + weights @ flags
+
+
+def rank_home(
+    index: AttributeIndex,
+    tag_sets: list[set[str]],
+    k: int = 20,
+    time_bucket: str | None = None,
+) -> list[list[DishRow]]:
+    # 打分只取决于命中的标签组合（最多 2^3 种），相同组合只算一次
+    keys = [home_tag_key(tags) for tags in tag_sets]
+    uniq = list(dict.fromkeys(keys))
+    scores = score_home(index, [set(key) for key in uniq], time_bucket)
+    ranked = {key: index.top_k(scores[i], k) for i, key in enumerate(uniq)}
+    return [ranked[key] for key in keys]
+
+
+async def recommend_home(db: AsyncSession, user_tags: list[str], time_bucket: str | None = None) -> list[DishRow]:
+    # 在售菜来自进程内菜单快照；打分是特征矩阵上的向量运算
+    index = (await get_catalog(db)).index
+    tags = set([t.lower() for t in (user_tags or [])])
+    return rank_home(index, [tags], time_bucket=time_bucket)[0]
 
 async def build_ai_candidates(
     db: AsyncSession,
@@ -111,61 +360,25 @@ async def build_ai_candidates(
 ) -> list[dict]:
     # 固定决策：候选集召回（一期）
     # 1) 只取在售
-    # 2) 先按关键词命中 + 销量评分排序取 top
-    # 3) 再做忌口/过敏源过滤（Python 过滤，保证正确）
-    res = await db.execute(select(Dish).where(Dish.status == "on_sale"))
-    dishes = list(res.scalars().all())
+    # 2) 按文本相关度（BM25）+ 属性命中 + 销量评分排序取 top
+    # 3) 忌口/过敏源过滤：命中行直接置为 -inf（整词匹配，保证正确）
+    snap = await get_catalog(db)
+    index = snap.index
     q = (user_query or "").lower()
-    restrictions = set([x.lower() for x in (dietary_restrictions or [])])
-
-    def violates(d: Dish) -> bool:
-        meta = d.ai_metadata or {}
-        ing = meta.get("ingredients", [])
-        allergens = meta.get("allergens", [])
-        # 固定决策：restrictions 同时匹配 ingredients/allergens 任意即排除
-        words = set([str(x).lower() for x in (ing or [])] + [str(x).lower() for x in (allergens or [])])
-        return any(r in words for r in restrictions)
-
-    def score(d: Dish) -> float:
-        s = float(d.rating_avg) * 0.3 + float(d.sales_count) * 0.0004
-        name = (d.name or "").lower()
-        meta = d.ai_metadata or {}
-        ing = " ".join([str(x).lower() for x in (meta.get("ingredients") or [])])
-        if q:
-            if q in name:
-                s += 3.0
-            if q in ing:
-                s += 2.0
-            if ("虾" in q or "shrimp" in q) and ("虾" in name or "shrimp" in ing):
-                s += 3.0
-            if ("清淡" in q or "light" in q):
-                taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
-                if taste.get("light", 0) >= 3 or taste.get("spicy", 99) <= 1:
-                    s += 2.0
-        return s
-
-    ranked = sorted([d for d in dishes if not violates(d)], key=score, reverse=True)[:limit]
-
-    def compress(d: Dish) -> dict:
-        meta = d.ai_metadata or {}
-        taste = meta.get("taste", {}) if isinstance(meta.get("taste", {}), dict) else {}
-        ingredients = meta.get("ingredients", []) if isinstance(meta.get("ingredients", []), list) else []
-        return {
-            "id": int(d.id),
-            "name": d.name,
-            "price": float(d.price),
-            "meta": {
-                "taste": {k: taste.get(k) for k in ["spicy","sweet","sour","numbing","greasy","light"]},
-                "temperature": meta.get("temperature"),
-                "ingredients": ingredients[:10],
-                "allergens": (meta.get("allergens") or [])[:10],
-                "diet": meta.get("diet", {}),
-                "scenes": meta.get("scenes", []),
-                "highlights": compute_highlights(meta),
-                "rating": float(d.rating_avg),
-                "sales": int(d.sales_count),
-                "fallback_reason": ["在售", "口碑与热销靠前", "与你的表达更匹配"]
-            }
-        }
-
-    return [compress(d) for d in ranked]
+
+    scores = index.derived("candidate_base", _candidate_base).copy()
+    if q:
+        # BM25 相关度归一化到 [0, 1]，最相关的菜加满 4 分
+        relevance = snap.search.scores(q)
+        if relevance:
+            top_relevance = max(relevance.values()) or 1.0
+            scores += index.dense(relevance) * (4.0 / top_relevance)
+        scores[index.mentioned_ingredient_rows(q)] += 2.0
+        if "虾" in q or "shrimp" in q:
+            scores += 3.0 * index.is_shrimp
+        if "清淡" in q or "light" in q:
+            scores += 2.0 * index.is_light_or_mild
+    scores[index.restricted_rows(dietary_restrictions or [])] = -np.inf
+
+    # 候选载荷在快照加载时已预计算，这里只做查表
+    return [d.candidate for d in index.top_k(scores, limit)]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import combinations
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user_preferences import UserPreferences
+from app.services.ai.recommender import get_time_bucket
+from app.services.catalog_service import CatalogSnapshot, DishRow, get_catalog
+from app.services.dish_service import HOME_TAG_BOOSTS, home_tag_key, rank_home
+from app.core.invalidation import invalidation_bus, publish_change
+
+
+# -----------------------------
+# 个性化首页推荐缓存（固定决策）
+# -----------------------------
+# - 用户 → 标签 key：每个 worker 一份 LRU，画像更新时失效（跨 worker 走 invalidation_bus）；
+#   另有 HOME_FEED_USER_TTL_SECONDS 兜底，漏掉的失效事件最多让旧标签多用一个 TTL
+# - (标签 key, 餐段) → 排序结果：挂在当前菜单快照上，快照换代（catalog version / TTL）即整体作废
+# - 标签 key 只保留影响打分的标签，组合最多 2^3 种；未命中时一次性把当前餐段的所有组合批量算好
+
+USER_PREFS_ENTITY = "user_preferences"
+HOME_FEED_SIZE = 20
+
+
+class HomeFeedCache:
+    def __init__(self, ttl_s: float, max_users: int = 50_000):
+        self.ttl_s = float(ttl_s)
+        self.max_users = max_users
+        # user_id → (标签 key, 过期时间 monotonic)
+        self._user_keys: OrderedDict[int, tuple[tuple[str, ...], float]] = OrderedDict()
+        self._snapshot: CatalogSnapshot | None = None
+        self._rankings: dict[tuple[tuple[str, ...], str], list[DishRow]] = {}
+
+    def invalidate_user(self, user_id: int | None) -> None:
+        if user_id is None:
+            self._user_keys.clear()
+        else:
+            self._user_keys.pop(int(user_id), None)
+
+    async def user_key(self, db: AsyncSession, user_id: int) -> tuple[str, ...]:
+        cached = self._user_keys.get(user_id)
+        if cached is not None:
+            if cached[1] > time.monotonic():
+                self._user_keys.move_to_end(user_id)
+                return cached[0]
+            del self._user_keys[user_id]
+        res = await db.execute(select(UserPreferences.explicit_tags).where(UserPreferences.user_id == user_id))
+        tags = res.scalar_one_or_none() or []
+        key = home_tag_key({str(t).lower() for t in tags})
+        if self.ttl_s <= 0:
+            return key
+        self._user_keys[user_id] = (key, time.monotonic() + self.ttl_s)
+        if len(self._user_keys) > self.max_users:
+            self._user_keys.popitem(last=False)
+        return key
+
+    def _rankings_for(self, snap: CatalogSnapshot) -> dict:
+        if self._snapshot is not snap:
+            self._snapshot = snap
+            self._rankings = {}
+        return self._rankings
+
+    async def get(self, db: AsyncSession, user_id: int, now: datetime | None = None) -> list[DishRow]:
+        key = await self.user_key(db, user_id)
+        bucket = get_time_bucket(now or datetime.now())
+        snap = await get_catalog(db)
+        rankings = self._rankings_for(snap)
+        ranked = rankings.get((key, bucket))
+        if ranked is None:
+            tags = [tag for tag, _, _ in HOME_TAG_BOOSTS]
+            all_keys = [c for r in range(len(tags) + 1) for c in combinations(tags, r)]
+            for k, rows in zip(all_keys, rank_home(snap.index, [set(k) for k in all_keys], HOME_FEED_SIZE, bucket)):
+                rankings[(k, bucket)] = rows
+            ranked = rankings[(key, bucket)]
+        return ranked
+
+
+home_feed_cache = HomeFeedCache(ttl_s=settings.HOME_FEED_USER_TTL_SECONDS)
+
+
+def _apply_user_prefs_event(event: dict) -> None:
+    entity = str(event.get("entity") or "*")
+    if entity == USER_PREFS_ENTITY:
+        entity_id = event.get("id")
+        home_feed_cache.invalidate_user(int(entity_id) if entity_id is not None else None)
+    elif entity == "*":
+        home_feed_cache.invalidate_user(None)
+
+
+invalidation_bus.subscribe(_apply_user_prefs_event)
+
+
+async def publish_user_prefs_change(user_id: int) -> None:
+    await publish_change(USER_PREFS_ENTITY, int(user_id))
@@ -4,16 +4,18 @@ from datetime import datetime
 from fastapi import HTTPException
 from typing import Any
 
-from sqlalchemy import select, update
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.models.address import UserAddress
-from app.models.dish import Dish, DishSpec
+from app.models.dish import Dish
 from app.models.events import PreferenceEvent
 from app.models.order import Order, OrderItem
 from app.models.user import User
 from app.schemas.order import OrderCreateIn
+from app.services.cart_service import empty_cart, lock_cart_lines
+from app.services.spec_index import SpecIndex, spec_index_cache, spec_price_delta
 
 
 # -----------------------------
@@ -35,63 +37,36 @@ def _time_bucket_local() -> str:
 # -----------------------------
 # 规格校验与价格增量
 # -----------------------------
-def _build_spec_index(spec_defs: list[DishSpec]) -> dict[str, list[dict]]:
-    """
-    返回：{spec_name: [ {name, price?}, ... ]}
-    """
-    idx: dict[str, list[dict]] = {}
-    for s in spec_defs:
-        values = s.spec_values or []
-        # 只保留 dict 项，保证健壮性
-        cleaned = [v for v in values if isinstance(v, dict) and isinstance(v.get("name"), str)]
-        idx[s.spec_name] = cleaned
-    return idx
-
-
-def _validate_specs(spec_defs: list[DishSpec], selected_specs: dict) -> None:
+def _validate_specs(spec_index: SpecIndex, selected_specs: dict) -> None:
     """
     固定决策：
     - selected_specs 的 key 必须在 dish_specs.spec_name 中
     - selected_specs 的 value 必须命中 spec_values[].name
+    spec_index 为该菜编译后的规格索引（见 app/services/spec_index.py）
     """
-    selected_specs = selected_specs or {}
-    spec_index = _build_spec_index(spec_defs)
-
-    for k, v in selected_specs.items():
-        if k not in spec_index:
+    for k, v in (selected_specs or {}).items():
+        options = spec_index.get(k)
+        if options is None:
             raise ValueError("invalid_spec_name")
-        allowed_names = [opt["name"] for opt in spec_index[k]]
-        if v not in allowed_names:
+        if not isinstance(v, str) or v not in options:
             raise ValueError("invalid_spec_value")
 
 
-def _spec_price_delta(spec_defs: list[DishSpec], selected_specs: dict) -> float:
-    """
-    固定决策：
-    - spec_values[] 可以包含 price（数值），作为加价增量
-    - 所有选中规格的 price 叠加
-    """
-    selected_specs = selected_specs or {}
-    spec_index = _build_spec_index(spec_defs)
-
-    delta = 0.0
-    for k, v in selected_specs.items():
-        for opt in spec_index.get(k, []):
-            if opt.get("name") == v:
-                try:
-                    delta += float(opt.get("price") or 0.0)
-                except (TypeError, ValueError):
-                    delta += 0.0
-                break
-    return float(delta)
-
-
 # -----------------------------
 # 订单创建
 # -----------------------------
 
 
 
+async def _check_address(db: AsyncSession, user_id: int, address_id: int) -> UserAddress:
+    addr = await db.get(UserAddress, int(address_id))
+    if not addr:
+        raise HTTPException(status_code=404, detail="address_not_found")
+    if int(getattr(addr, "user_id")) != int(user_id):
+        raise HTTPException(status_code=403, detail="address_forbidden")
+    return addr
+
+
 def _time_bucket(dt: datetime) -> str:
     h = dt.hour
     if 5 <= h < 11:
@@ -168,11 +143,7 @@ async def create_order(
     tx = (db.begin_nested() if db.in_transaction() else db.begin())
     async with tx:
         # 3.1 地址校验
-        addr = await db.get(UserAddress, int(address_id))
-        if not addr:
-            raise HTTPException(status_code=404, detail="address_not_found")
-        if int(getattr(addr, "user_id")) != int(user_id):
-            raise HTTPException(status_code=403, detail="address_forbidden")
+        await _check_address(db, user_id, address_id)
 
         # 3.2 菜品校验
         dish_ids = [it["dish_id"] for it in norm_items]
@@ -188,16 +159,20 @@ async def create_order(
             if getattr(d, "status", "on_sale") != "on_sale":
                 raise HTTPException(status_code=400, detail={"code": "dish_not_on_sale", "dish_id": int(d.id)})
 
-        # 3.3 总价（暂不处理规格加价）
+        # 3.3 规格校验 + 定价：规格索引按 catalog version 缓存，未命中的菜一次 IN 查询补齐
+        spec_index = await spec_index_cache.get_many(db, dish_map)
         total = 0.0
         for it in norm_items:
             d = dish_map[it["dish_id"]]
-            total += float(getattr(d, "price")) * int(it["quantity"])
+            idx = spec_index.get(it["dish_id"], {})
+            _validate_specs(idx, it["selected_specs"])
+            it["unit_price"] = round(float(getattr(d, "price")) + spec_price_delta(idx, it["selected_specs"]), 2)
+            total += it["unit_price"] * int(it["quantity"])
 
         # 3.4 创建订单
         order = Order(
             user_id=int(user_id),
-            total_amount=total,
+            total_amount=round(total, 2),
             status="pending",
             note=note,
             context_snapshot=context_snapshot,
@@ -209,26 +184,101 @@ async def create_order(
         db.add(order)
         await db.flush()
 
-        # 3.5 创建订单明细（快照）
-        for it in norm_items:
-            d = dish_map[it["dish_id"]]
-            oi = OrderItem(
-                order_id=int(order.id),
-                dish_id=int(d.id),
-                dish_name=getattr(d, "name", ""),
-                quantity=int(it["quantity"]),
-                price_snapshot=float(getattr(d, "price")),
-                selected_specs=it["selected_specs"],
-            )
-            db.add(oi)
-
-        await db.flush()
-        await db.refresh(order)
+        # 3.5 订单明细（快照）：一条多行 INSERT，语句数与明细行数无关
+        await db.execute(
+            insert(OrderItem)
+            .values([
+                {
+                    "order_id": int(order.id),
+                    "dish_id": it["dish_id"],
+                    "dish_name": getattr(dish_map[it["dish_id"]], "name", ""),
+                    "quantity": int(it["quantity"]),
+                    "price_snapshot": it["unit_price"],
+                    "selected_specs": it["selected_specs"],
+                    "ai_metadata_snapshot": getattr(dish_map[it["dish_id"]], "ai_metadata", None) or {},
+                }
+                for it in norm_items
+            ])
+        )
         return order
 
 
 
 
+async def create_order_from_cart(
+    db: AsyncSession,
+    user_id: int,
+    address_id: int,
+    note: str | None = None,
+    cart_version: int | None = None,
+) -> Order:
+    """
+    购物车直接结算（POST /orders:from-cart），一个事务：
+    - 锁购物车行与明细（FOR UPDATE），同一条语句取当前菜价/在售状态
+    - 选中规格须仍在当前规格定义内（invalid_spec_name / invalid_spec_value）
+    - 单价 = 菜价 + 规格加价（spec_price_delta，规格索引），price_snapshot 记单价；AI 元数据一并快照
+    - 订单一条 INSERT，明细一条多行 INSERT，随后清空购物车（version+1）
+    - cart_version：客户端看到的购物车版本，不一致时拒绝（避免按过期的购物车下单）
+    """
+    now = datetime.utcnow()
+    try:
+        await _check_address(db, user_id, address_id)
+
+        cart_id, version, lines = await lock_cart_lines(db, int(user_id))
+        if cart_id is None:
+            raise ValueError("cart_empty")
+        if cart_version is not None and int(cart_version) != version:
+            raise ValueError("cart_version_conflict")
+        off_sale = sorted({int(ln["dish_id"]) for ln in lines if ln["status"] != "on_sale"})
+        if off_sale:
+            raise HTTPException(status_code=400, detail={"code": "dish_not_on_sale", "ids": off_sale})
+        # 加购时未校验规格：结算时按当前规格定义校验并定价（规格索引缓存，通常不查库），
+        # 与 POST /orders、购物车视图同一口径
+        spec_index = await spec_index_cache.get_many(db, (ln["dish_id"] for ln in lines))
+        total = 0.0
+        for ln in lines:
+            idx = spec_index.get(int(ln["dish_id"]), {})
+            selected = ln["selected_specs"] or {}
+            _validate_specs(idx, selected)
+            ln["unit_price"] = round(ln["price"] + spec_price_delta(idx, selected), 2)
+            total += ln["unit_price"] * int(ln["quantity"])
+
+        order = Order(
+            user_id=int(user_id),
+            total_amount=round(total, 2),
+            status="pending",
+            note=note,
+            context_snapshot={
+                "created_at_utc": now.isoformat(),
+                "time_bucket": _time_bucket(now),
+                "weekday": now.weekday(),
+                "source": "cart",
+            },
+        )
+        db.add(order)
+        await db.flush()
+
+        await db.execute(insert(OrderItem).values([
+            {
+                "order_id": int(order.id),
+                "dish_id": int(ln["dish_id"]),
+                "dish_name": ln["dish_name"],
+                "quantity": int(ln["quantity"]),
+                "price_snapshot": ln["unit_price"],
+                "selected_specs": ln["selected_specs"] or {},
+                "ai_metadata_snapshot": ln["ai_metadata"] or {},
+            }
+            for ln in lines
+        ]))
+        await empty_cart(db, cart_id)
+    except (ValueError, HTTPException):
+        await db.rollback()
+        raise
+
+    await db.commit()
+    return order
+
+
 # -----------------------------
 # 状态流转（支付/完成/取消）
 # -----------------------------
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.exc import IntegrityError
 
+from app.db.read import as_timestamp_text, fetch_dicts, fetch_scalar, json_or
 from app.models.review import Review
 from app.models.order import Order, OrderItem
 from app.models.dish import Dish
@@ -61,15 +62,12 @@ async def create_review(
     await db.commit()
     return rv
 
-async def list_reviews_by_dish(db: AsyncSession, dish_id: int, limit: int = 20, offset: int = 0) -> tuple[list[Review], int]:
-    total_res = await db.execute(select(func.count()).select_from(Review).where(Review.dish_id == dish_id))
-    total = int(total_res.scalar() or 0)
-
-    res = await db.execute(
-        select(Review)
-        .where(Review.dish_id == dish_id)
-        .order_by(Review.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    return list(res.scalars().all()), total
+async def list_reviews_by_dish(db: AsyncSession, dish_id: int, limit: int = 20, offset: int = 0) -> tuple[list[dict], int]:
+    # 轻量读路径：只取列、不建实体，行直接是 ReviewOut 的字段
+    t = Review.__table__
+    total = int(await fetch_scalar(db, select(func.count()).select_from(t).where(t.c.dish_id == dish_id)) or 0)
+    rows = await fetch_dicts(db, select(
+        t.c.id, t.c.user_id, t.c.dish_id, t.c.order_id, t.c.rating, t.c.comment,
+        json_or(t.c.tags, "[]"), as_timestamp_text(t.c.created_at),
+    ).where(t.c.dish_id == dish_id).order_by(t.c.created_at.desc()).limit(limit).offset(offset))
+    return rows, total
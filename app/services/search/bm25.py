@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import heapq
+import math
+from collections import Counter
+from typing import Iterable
+
+from app.services.search.tokenizer import key_terms, tokenize
+
+
+class BM25Index:
+    """
+    进程内 BM25 倒排索引（多字段加权，支持增量 add/remove）。
+
+    - fields：{字段名: 文本}；字段权重放大词频（BM25F 的简化形式）
+    - 文档长度 = 加权后的词数，用于长度归一化
+    - add/remove 原地修改；要在已发布的实例上改动，先 clone()（快照写时复制）
+    """
+
+    def __init__(self, field_weights: dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, dict[int, float]] = {}
+        self.doc_terms: dict[int, dict[str, float]] = {}
+        self.doc_len: dict[int, float] = {}
+        self.total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def clone(self) -> "BM25Index":
+        # doc_terms 的值在 add 之后不再修改，可共享；倒排表逐个复制
+        other = BM25Index(self.field_weights, k1=self.k1, b=self.b)
+        other.postings = {term: dict(plist) for term, plist in self.postings.items()}
+        other.doc_terms = dict(self.doc_terms)
+        other.doc_len = dict(self.doc_len)
+        other.total_len = self.total_len
+        return other
+
+    def add(self, doc_id: int, fields: dict[str, str | None]) -> None:
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        tf: dict[str, float] = {}
+        length = 0.0
+        for name, text in fields.items():
+            w = self.field_weights.get(name, 1.0)
+            for term, n in Counter(tokenize(text)).items():
+                tf[term] = tf.get(term, 0.0) + w * n
+                length += w * n
+        for term, f in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = f
+        self.doc_terms[doc_id] = tf
+        self.doc_len[doc_id] = length
+        self.total_len += length
+
+    def remove(self, doc_id: int) -> None:
+        tf = self.doc_terms.pop(doc_id, None)
+        if tf is None:
+            return
+        for term in tf:
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(doc_id, None)
+                if not plist:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id, 0.0)
+
+    def scores(self, query: str) -> dict[int, float]:
+        """返回 {doc_id: score}，只包含至少命中一个词的文档。"""
+        n = len(self.doc_len)
+        if not n:
+            return {}
+        avgdl = (self.total_len / n) or 1.0
+        k1, b = self.k1, self.b
+        doc_len = self.doc_len
+        out: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            df = len(plist)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, f in plist.items():
+                denom = f + k1 * (1.0 - b + b * doc_len[doc_id] / avgdl)
+                out[doc_id] = out.get(doc_id, 0.0) + idf * f * (k1 + 1.0) / denom
+        return out
+
+    def matching(self, query: str) -> set[int]:
+        """至少包含一个 key_terms（中文二元组/整词）的文档。"""
+        out: set[int] = set()
+        for term in key_terms(query):
+            out.update(self.postings.get(term, ()))
+        return out
+
+    def search(
+        self,
+        query: str,
+        allowed: Iterable[int] | None = None,
+        limit: int | None = None,
+        strict: bool = False,
+    ) -> list[tuple[int, float]]:
+        """
+        按相关度降序（同分按 id 升序）返回 [(doc_id, score)]。
+        strict=True：只保留命中 key_terms 的文档（关键词过滤用），单字命中只参与打分。
+        """
+        scored = self.scores(query)
+        if strict:
+            hits = self.matching(query)
+            scored = {k: v for k, v in scored.items() if k in hits}
+        if allowed is not None:
+            allowed = allowed if isinstance(allowed, (set, frozenset, dict)) else set(allowed)
+            scored = {k: v for k, v in scored.items() if k in allowed}
+        items = scored.items()
+        if limit is not None:
+            return heapq.nsmallest(limit, items, key=lambda kv: (-kv[1], kv[0]))
+        return sorted(items, key=lambda kv: (-kv[1], kv[0]))
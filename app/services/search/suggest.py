@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import heapq
+import unicodedata
+
+try:
+    # 可选依赖：装了 pypinyin 才支持拼音首字母联想（如 “gbjd” → 宫保鸡丁）
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pragma: no cover
+    lazy_pinyin = None
+
+
+# -----------------------------
+# 前缀联想索引（固定决策）
+# -----------------------------
+# - 字符级 trie；每个条目（菜品/分类）可挂多个 key：名称、拼音首字母
+# - 节点懒缓存子树内权重最高的 CACHE_SIZE 个条目；增删条目只作废 key 路径上的缓存
+# - 权重：菜品 = 销量；分类 = 分类下在售菜销量之和
+# - 随菜单快照增量维护（与 BM25 索引相同）：补丁时先 clone() 再原地修改，已发布快照里的实例不变
+
+CACHE_SIZE = 10
+
+Entry = tuple[str, int]  # (kind, id)
+
+
+def normalize(text: str | None) -> str:
+    return unicodedata.normalize("NFKC", text or "").strip().lower()
+
+
+def pinyin_initials(text: str) -> str:
+    if lazy_pinyin is None:
+        return ""
+    letters = lazy_pinyin(text, style=Style.FIRST_LETTER, errors="ignore")
+    return "".join(x for x in letters if x.isalnum()).lower()
+
+
+class _Node:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.entries: set[Entry] = set()
+        self.top: list[Entry] | None = None
+
+    def clone(self) -> "_Node":
+        node = _Node()
+        node.entries = set(self.entries)
+        node.top = list(self.top) if self.top is not None else None
+        node.children = {ch: child.clone() for ch, child in self.children.items()}
+        return node
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.root = _Node()
+        # 条目 → (展示文本, 权重, 挂载的 key)
+        self.items: dict[Entry, tuple[str, float, tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def clone(self) -> "SuggestIndex":
+        other = SuggestIndex()
+        other.root = self.root.clone()
+        other.items = dict(self.items)
+        return other
+
+    def _keys(self, text: str) -> tuple[str, ...]:
+        name = normalize(text)
+        keys = [name]
+        initials = pinyin_initials(name)
+        if initials and initials != name:
+            keys.append(initials)
+        return tuple(k for k in dict.fromkeys(keys) if k)
+
+    def _path(self, key: str, create: bool) -> list[_Node]:
+        node = self.root
+        path = [node]
+        for ch in key:
+            nxt = node.children.get(ch)
+            if nxt is None:
+                if not create:
+                    return path
+                nxt = node.children[ch] = _Node()
+            node = nxt
+            path.append(node)
+        return path
+
+    def add(self, kind: str, entry_id: int, text: str, weight: float) -> None:
+        entry = (kind, int(entry_id))
+        if entry in self.items:
+            self.remove(kind, entry_id)
+        keys = self._keys(text)
+        self.items[entry] = (text, float(weight), keys)
+        for key in keys:
+            path = self._path(key, create=True)
+            path[-1].entries.add(entry)
+            for node in path:
+                node.top = None
+
+    def remove(self, kind: str, entry_id: int) -> None:
+        entry = (kind, int(entry_id))
+        item = self.items.pop(entry, None)
+        if item is None:
+            return
+        for key in item[2]:
+            path = self._path(key, create=False)
+            if len(path) == len(key) + 1:
+                path[-1].entries.discard(entry)
+            for node in path:
+                node.top = None
+            # 剪掉空分支，避免下架/改名后留下无用节点
+            for i in range(len(path) - 1, 0, -1):
+                node = path[i]
+                if node.entries or node.children:
+                    break
+                del path[i - 1].children[key[i - 1]]
+
+    def remove_kind(self, kind: str) -> None:
+        for entry in [e for e in self.items if e[0] == kind]:
+            self.remove(*entry)
+
+    def _top(self, node: _Node) -> list[Entry]:
+        if node.top is None:
+            weight = lambda e: (self.items[e][1], -e[1])
+            pool: set[Entry] = set(node.entries)
+            for child in node.children.values():
+                pool.update(self._top(child))
+            node.top = heapq.nlargest(CACHE_SIZE, pool, key=weight)
+        return node.top
+
+    def suggest(self, prefix: str, limit: int = 8) -> list[tuple[str, int, str, float]]:
+        """返回 [(kind, id, 文本, 权重)]，按权重降序；limit 不超过 CACHE_SIZE。"""
+        key = normalize(prefix)
+        if not key:
+            return []
+        path = self._path(key, create=False)
+        if len(path) != len(key) + 1:
+            return []
+        out = []
+        for entry in self._top(path[-1])[: max(0, min(int(limit), CACHE_SIZE))]:
+            text, weight, _ = self.items[entry]
+            out.append((entry[0], entry[1], text, weight))
+        return out
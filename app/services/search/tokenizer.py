@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import re
+
+# 固定决策：中日韩文字按“单字 + 相邻二元组”切分，其它按字母数字词切分
+# - 不依赖分词词典，“清蒸虾” → 清 蒸 虾 清蒸 蒸虾
+# - 单字保证“虾”这类一个字的查询也能命中；二元组负责短语相关性
+# - 关键词过滤（列表检索）只认 key_terms：多字片段用二元组、单字片段用单字，
+#   避免“清蒸虾”因为一个“清”字就召回所有带“清”的菜；AI 召回仍用全部词打分
+_CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[a-z0-9]+(?:['_-][a-z0-9]+)*")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    out: list[str] = []
+    for run in _TOKEN_RE.findall(str(text).lower()):
+        if _CJK_RE.match(run):
+            out.extend(run)
+            out.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            out.append(run)
+    return out
+
+
+def key_terms(text: str | None) -> set[str]:
+    """过滤用的关键词：中日韩连续片段取相邻二元组（单字片段取该字），其它取整词。"""
+    if not text:
+        return set()
+    out: set[str] = set()
+    for run in _TOKEN_RE.findall(str(text).lower()):
+        if _CJK_RE.match(run) and len(run) > 1:
+            out.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            out.add(run)
+    return out
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dish import DishSpec
+from app.services.catalog_service import catalog_cache
+from app.core.invalidation import invalidation_bus
+
+
+# -----------------------------
+# 规格索引缓存（固定决策）
+# -----------------------------
+# - 每道菜的规格编译成 {规格名: {选项名: 加价}}，校验与定价都是 O(1) 字典查找，不再逐次解析 JSONB
+# - 缓存按 catalog version 整体失效（菜单一天只改几次）；同时订阅 invalidation_bus 按菜品丢弃，
+#   乱序到达、不推进 version 的事件也不会留下旧规格
+# - 未命中的菜一次 IN 查询补齐；没有规格的菜缓存为空字典
+# - 查库期间若发生失效，查到的结果只用于本次请求，不写回缓存
+
+SpecIndex = dict[str, dict[str, float]]
+
+
+def compile_specs(spec_defs: Iterable[tuple[str, list]]) -> SpecIndex:
+    """
+    spec_defs：按 dish_specs.id 排序的 (spec_name, spec_values)。
+    spec_values[] 只认 {name: str, price?: number} 形式的项；price 缺失或非数值按 0 计。
+    """
+    idx: SpecIndex = {}
+    for spec_name, spec_values in spec_defs:
+        options: dict[str, float] = {}
+        for v in spec_values or []:
+            if not isinstance(v, dict) or not isinstance(v.get("name"), str):
+                continue
+            try:
+                price = float(v.get("price") or 0.0)
+            except (TypeError, ValueError):
+                price = 0.0
+            # 同名选项取第一个
+            options.setdefault(v["name"], price)
+        idx[spec_name] = options
+    return idx
+
+
+def spec_price_delta(spec_index: SpecIndex, selected_specs: dict) -> float:
+    """
+    选中规格的加价合计：每个 (规格名, 选项名) 取编译后的 price 叠加，未命中按 0 计。
+    下单、购物车结算、购物车视图统一用它计价（规格加价只有这一套口径）。
+    """
+    delta = 0.0
+    for k, v in (selected_specs or {}).items():
+        options = spec_index.get(k)
+        if options and isinstance(v, str):
+            delta += options.get(v, 0.0)
+    return float(delta)
+
+
+class SpecIndexCache:
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = int(max_entries)
+        self._entries: OrderedDict[int, SpecIndex] = OrderedDict()
+        self._catalog_version = catalog_cache.version
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sync_version(self) -> None:
+        if self._catalog_version != catalog_cache.version:
+            self._entries.clear()
+            self._catalog_version = catalog_cache.version
+            self._generation += 1
+
+    def invalidate(self, dish_id: int | None = None) -> None:
+        if dish_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(int(dish_id), None)
+        self._generation += 1
+
+    async def get_many(self, db: AsyncSession, dish_ids: Iterable[int]) -> dict[int, SpecIndex]:
+        self._sync_version()
+        out: dict[int, SpecIndex] = {}
+        missing: list[int] = []
+        for dish_id in dict.fromkeys(int(i) for i in dish_ids):
+            idx = self._entries.get(dish_id)
+            if idx is None:
+                missing.append(dish_id)
+            else:
+                self._entries.move_to_end(dish_id)
+                out[dish_id] = idx
+        if not missing:
+            return out
+
+        generation = self._generation
+        res = await db.execute(select(DishSpec).where(DishSpec.dish_id.in_(missing)).order_by(DishSpec.id))
+        by_dish: dict[int, list[DishSpec]] = {dish_id: [] for dish_id in missing}
+        for s in res.scalars().all():
+            by_dish[int(s.dish_id)].append(s)
+
+        self._sync_version()
+        fresh = generation == self._generation
+        for dish_id, defs in by_dish.items():
+            idx = compile_specs((s.spec_name, s.spec_values) for s in defs)
+            out[dish_id] = idx
+            if fresh:
+                self._entries[dish_id] = idx
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return out
+
+
+spec_index_cache = SpecIndexCache()
+
+
+def _apply_spec_event(event: dict) -> None:
+    entity = str(event.get("entity") or "*")
+    if entity == "dish" and event.get("id") is not None:
+        spec_index_cache.invalidate(int(event["id"]))
+    elif entity == "*":
+        spec_index_cache.invalidate(None)
+
+
+invalidation_bus.subscribe(_apply_spec_event)
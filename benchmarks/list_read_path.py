@@ -0,0 +1,138 @@
+"""
+列表接口读路径基准：ORM 实体 vs Core 列查询。
+
+对同一条列表查询分别用两种方式跑 N 轮（每轮新会话，与请求内的用法一致）：
+- orm：select(实体) → identity map → 逐字段 int()/float()/str() 拼 dict（改造前的写法）
+- core：只 select 需要的列、类型转换在 SQL 里完成，行直接转 dict（app/db/read.py）
+输出每种方式的 rows/s，以及单轮的 Python 内存分配峰值（tracemalloc）和分配块数。
+
+用法（读取 .env 里的 DATABASE_URL，建议先灌入足够多的数据）：
+    python -m benchmarks.list_read_path --target reviews --limit 200 --rounds 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+
+from app.db.read import as_float, as_timestamp_text, fetch_dicts, json_or
+from app.db.session import AsyncSessionLocal, engine
+from app.models.dish import Dish
+from app.models.order import Order
+from app.models.review import Review
+
+
+async def orm_dishes(db, limit):
+    res = await db.execute(select(Dish).order_by(Dish.id.desc()).limit(limit))
+    return [{
+        "id": int(d.id), "name": d.name, "price": float(d.price), "status": d.status,
+        "category_id": d.category_id, "ai_metadata": d.ai_metadata or {},
+    } for d in res.scalars().all()]
+
+
+async def core_dishes(db, limit):
+    t = Dish.__table__
+    return await fetch_dicts(db, select(
+        t.c.id, t.c.name, as_float(t.c.price), t.c.status, t.c.category_id, json_or(t.c.ai_metadata, "{}"),
+    ).order_by(t.c.id.desc()).limit(limit))
+
+
+async def orm_orders(db, limit):
+    res = await db.execute(select(Order).order_by(Order.created_at.desc()).limit(limit))
+    return [{
+        "id": int(o.id), "user_id": int(o.user_id), "status": o.status,
+        "total_amount": float(o.total_amount), "created_at": str(o.created_at) if o.created_at else None,
+    } for o in res.scalars().all()]
+
+
+async def core_orders(db, limit):
+    t = Order.__table__
+    return await fetch_dicts(db, select(
+        t.c.id, t.c.user_id, t.c.status, as_float(t.c.total_amount), as_timestamp_text(t.c.created_at),
+    ).order_by(t.c.created_at.desc()).limit(limit))
+
+
+async def orm_reviews(db, limit):
+    res = await db.execute(select(Review).order_by(Review.created_at.desc()).limit(limit))
+    return [{
+        "id": int(r.id), "user_id": int(r.user_id), "dish_id": int(r.dish_id), "order_id": int(r.order_id),
+        "rating": int(r.rating), "comment": r.comment, "tags": r.tags or [],
+        "created_at": str(r.created_at) if r.created_at else None,
+    } for r in res.scalars().all()]
+
+
+async def core_reviews(db, limit):
+    t = Review.__table__
+    return await fetch_dicts(db, select(
+        t.c.id, t.c.user_id, t.c.dish_id, t.c.order_id, t.c.rating, t.c.comment,
+        json_or(t.c.tags, "[]"), as_timestamp_text(t.c.created_at),
+    ).order_by(t.c.created_at.desc()).limit(limit))
+
+
+TARGETS = {
+    "dishes": (orm_dishes, core_dishes),
+    "orders": (orm_orders, core_orders),
+    "reviews": (orm_reviews, core_reviews),
+}
+
+
+async def one_round(fn, limit) -> list[dict]:
+    async with AsyncSessionLocal() as db:
+        return await fn(db, limit)
+
+
+async def measure(fn, limit: int, rounds: int) -> dict:
+    # 预热：建连接、编译缓存
+    for _ in range(3):
+        await one_round(fn, limit)
+
+    rows = 0
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        rows += len(await one_round(fn, limit))
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    out = await one_round(fn, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(0, s.count_diff) for s in after.compare_to(before, "lineno"))
+    del out
+
+    return {
+        "rows": rows,
+        "rows_per_s": rows / elapsed if elapsed else float("nan"),
+        "ms_per_round": elapsed / rounds * 1000,
+        "peak_kib": peak / 1024,
+        "live_blocks": blocks,
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--target", choices=sorted(TARGETS), default="reviews")
+    ap.add_argument("--limit", type=int, default=200)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    orm_fn, core_fn = TARGETS[args.target]
+    print(f"{args.target} limit={args.limit} rounds={args.rounds}")
+    try:
+        for name, fn in (("orm", orm_fn), ("core", core_fn)):
+            r = await measure(fn, args.limit, args.rounds)
+            print(
+                f"  {name:<5} rows/s={r['rows_per_s']:10.0f} ms/round={r['ms_per_round']:7.2f} "
+                f"alloc_peak={r['peak_kib']:8.1f}KiB live_blocks={r['live_blocks']}"
+            )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+登录风暴下非鉴权接口的延迟基准。
+
+先单独压测探针接口得到基线，再在并发登录的同时压测同一探针，对比 p50/p99。
+口令哈希在事件循环里同步执行时，登录风暴期间探针的 p99 会被拉高到数百毫秒；
+放进进程池后应与基线接近（登录本身超出排队上限时返回 503）。
+
+用法（先启动服务，例如 uvicorn app.main:app --workers 1）：
+    python benchmarks/login_storm.py --base http://127.0.0.1:8000 --logins 400 --concurrency 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+
+def pct(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, out: list[float], interval: float) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get(path)
+        out.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def login_storm(client: httpx.AsyncClient, n: int, concurrency: int, username: str, password: str) -> Counter:
+    codes: Counter = Counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            r = await client.post("/api/auth/login", json={"username": username, "password": password})
+            codes[r.status_code] += 1
+
+    await asyncio.gather(*[one() for _ in range(n)])
+    return codes
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--probe", default="/api/dishes/categories")
+    ap.add_argument("--logins", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--baseline-seconds", type=float, default=3.0)
+    ap.add_argument("--probe-interval", type=float, default=0.01)
+    ap.add_argument("--username", default="bench_user")
+    ap.add_argument("--password", default="bench_password")
+    args = ap.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=30) as client:
+        # 已存在时返回 409，忽略即可
+        await client.post("/api/auth/register", json={"username": args.username, "password": args.password})
+
+        baseline: list[float] = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe, stop, baseline, args.probe_interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await task
+
+        during: list[float] = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe, stop, during, args.probe_interval))
+        t0 = time.perf_counter()
+        codes = await login_storm(client, args.logins, args.concurrency, args.username, args.password)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await task
+
+    print(f"probe {args.probe}")
+    for name, values in (("baseline", baseline), ("login storm", during)):
+        print(
+            f"  {name:<12} n={len(values):<5} p50={pct(values, 0.50):7.2f}ms "
+            f"p99={pct(values, 0.99):7.2f}ms max={max(values, default=float('nan')):7.2f}ms "
+            f"mean={statistics.fmean(values) if values else float('nan'):7.2f}ms"
+        )
+    print(f"logins {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s) status={dict(codes)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+口令校验对事件循环延迟的影响（进程内，不需要数据库/服务）。
+
+探针协程每隔 interval 醒来一次，记录实际醒来时间与预期的偏差（事件循环延迟）——
+同一 worker 上其它请求感受到的额外延迟就是这个值。
+先单独跑探针得到基线，再在并发 N 次 verify_password 的同时跑探针，分两种执行方式：
+- inline：在协程里直接同步调用 verify_password（改造前登录接口的写法）
+- pool：await verify_password_async（app/core/password_pool.py，进程池）
+输出每种情况下探针延迟的 p50/p99/max，以及校验吞吐。
+
+用法：
+    python -m benchmarks.password_loop_lag --verifies 200 --concurrency 50 --workers 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.core.password_pool import PasswordPool
+from app.core.security import hash_password, verify_password
+
+
+def pct(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+async def probe(stop: asyncio.Event, out: list[float], interval: float) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        out.append(max(0.0, (time.perf_counter() - t0 - interval) * 1000))
+
+
+async def storm(verify, n: int, concurrency: int, raw: str, hashed: str) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            assert await verify(raw, hashed)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(n)])
+    return time.perf_counter() - t0
+
+
+async def measure(verify, args, raw: str, hashed: str) -> tuple[list[float], float]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(probe(stop, lags, args.probe_interval))
+    if verify is None:
+        await asyncio.sleep(args.baseline_seconds)
+        elapsed = 0.0
+    else:
+        elapsed = await storm(verify, args.verifies, args.concurrency, raw, hashed)
+    stop.set()
+    await task
+    return lags, elapsed
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--verifies", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--baseline-seconds", type=float, default=2.0)
+    ap.add_argument("--probe-interval", type=float, default=0.005)
+    args = ap.parse_args()
+
+    raw = "bench_password"
+    hashed = hash_password(raw)
+    pool = PasswordPool(workers=args.workers, max_queue=args.verifies)
+    pool.start()
+
+    async def inline(r, h):
+        return verify_password(r, h)
+
+    async def pooled(r, h):
+        return await pool.run(verify_password, r, h)
+
+    # 预热：拉起子进程
+    await asyncio.gather(*[pooled(raw, hashed) for _ in range(max(1, args.workers))])
+
+    print(f"verifies={args.verifies} concurrency={args.concurrency} workers={args.workers}")
+    try:
+        for name, verify in (("baseline", None), ("inline", inline), ("pool", pooled)):
+            lags, elapsed = await measure(verify, args, raw, hashed)
+            rate = f"{args.verifies / elapsed:7.1f}/s" if elapsed else "      -"
+            print(
+                f"  {name:<8} loop lag n={len(lags):<5} p50={pct(lags, 0.50):8.2f}ms "
+                f"p99={pct(lags, 0.99):8.2f}ms max={max(lags, default=float('nan')):8.2f}ms verify={rate}"
+            )
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
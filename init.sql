@@ -3,8 +3,8 @@
 -- PostgreSQL 13+
 -- =========================
 
--- 可选：扩展
--- CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- 扩展：pg_trgm 用于菜品模糊检索
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- =========================
 -- 1. 用户与权限
@@ -66,6 +66,7 @@ CREATE TABLE dishes (
     image_url VARCHAR(255),
     status VARCHAR(20) NOT NULL DEFAULT 'on_sale', -- on_sale/sold_out/offline
     ai_metadata JSONB NOT NULL DEFAULT '{}',       -- AI 决策元数据（结构化）
+    ai_highlights JSONB NOT NULL DEFAULT '[]',     -- 由 ai_metadata 写时派生的徽章（["清淡","不辣"]）
     sales_count INT NOT NULL DEFAULT 0,
     rating_avg DECIMAL(3,1) NOT NULL DEFAULT 5.0,
     rating_count INT NOT NULL DEFAULT 0,
@@ -78,6 +79,13 @@ CREATE INDEX idx_dishes_ai_metadata_gin ON dishes USING GIN (ai_metadata);
 CREATE INDEX idx_dishes_category_status ON dishes (category_id, status);
 CREATE INDEX idx_dishes_sales_count ON dishes (sales_count DESC);
 CREATE INDEX idx_dishes_rating ON dishes (rating_avg DESC);
+-- 列表 keyset 分页：(status, 排序键, id)，与 ORDER BY 方向一致
+CREATE INDEX idx_dishes_status_id ON dishes (status, id);
+CREATE INDEX idx_dishes_status_sales_id ON dishes (status, sales_count DESC, id DESC);
+CREATE INDEX idx_dishes_status_rating_id ON dishes (status, rating_avg DESC, id DESC);
+CREATE INDEX idx_dishes_status_price_id ON dishes (status, price, id);
+-- 模糊检索（GET /dishes?mode=fuzzy）：名称+描述的三元组索引；表达式需与 dish_service.TRGM_DOCUMENT 一致
+CREATE INDEX idx_dishes_search_trgm ON dishes USING GIN ((name || ' ' || coalesce(description, '')) gin_trgm_ops);
 
 -- =========================
 -- 5. 菜品规格
@@ -97,7 +105,8 @@ CREATE INDEX idx_dish_specs_dish ON dish_specs (dish_id);
 CREATE TABLE carts (
     id BIGSERIAL PRIMARY KEY,
     user_id BIGINT NOT NULL UNIQUE REFERENCES users(id) ON DELETE CASCADE,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version BIGINT NOT NULL DEFAULT 0              -- 每次写购物车 +1
 );
 
 CREATE TABLE cart_items (
@@ -106,10 +115,12 @@ CREATE TABLE cart_items (
     dish_id BIGINT NOT NULL REFERENCES dishes(id),
     quantity INT NOT NULL CHECK (quantity > 0),
     selected_specs JSONB NOT NULL DEFAULT '{}',
+    spec_key TEXT NOT NULL DEFAULT '{}',          -- selected_specs::text，同规格合并键
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_cart_items_cart ON cart_items (cart_id);
+-- 加购 upsert 的冲突目标；前缀 cart_id 同时承担按购物车查明细
+CREATE UNIQUE INDEX uq_cart_items_cart_dish_spec ON cart_items (cart_id, dish_id, spec_key);
 CREATE INDEX idx_cart_items_dish ON cart_items (dish_id);
 
 -- =========================
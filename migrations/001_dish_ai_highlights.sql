@@ -0,0 +1,6 @@
+-- =========================
+-- 001 菜品徽章写时物化
+-- 新库直接用 init.sql；存量库执行本文件后再运行：
+--   python -m app.scripts.backfill_dish_highlights
+-- =========================
+ALTER TABLE dishes ADD COLUMN IF NOT EXISTS ai_highlights JSONB NOT NULL DEFAULT '[]';
@@ -0,0 +1,8 @@
+-- =========================
+-- 002 菜品列表 keyset 分页索引
+-- (status, 排序键, id)，与 GET /dishes 的 ORDER BY 方向一致
+-- =========================
+CREATE INDEX IF NOT EXISTS idx_dishes_status_id ON dishes (status, id);
+CREATE INDEX IF NOT EXISTS idx_dishes_status_sales_id ON dishes (status, sales_count DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_dishes_status_rating_id ON dishes (status, rating_avg DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_dishes_status_price_id ON dishes (status, price, id);
@@ -0,0 +1,8 @@
+-- =========================
+-- 003 菜品模糊检索（pg_trgm）
+-- GET /dishes?keyword=...&mode=fuzzy 使用；表达式需与 dish_service.TRGM_DOCUMENT 逐字一致
+-- 大表建议改用 CREATE INDEX CONCURRENTLY（不能放在事务里执行）
+-- =========================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_dishes_search_trgm
+    ON dishes USING GIN ((name || ' ' || coalesce(description, '')) gin_trgm_ops);
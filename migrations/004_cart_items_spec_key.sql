@@ -0,0 +1,30 @@
+-- =========================
+-- 004 购物车明细同规格合并键
+-- spec_key = selected_specs::text（jsonb 规范文本），与 cart_service._spec_key 一致；
+-- 加购改为 INSERT ... ON CONFLICT (cart_id, dish_id, spec_key) DO UPDATE 单条语句
+-- =========================
+BEGIN;
+
+ALTER TABLE cart_items ADD COLUMN IF NOT EXISTS spec_key TEXT;
+UPDATE cart_items SET spec_key = selected_specs::text WHERE spec_key IS NULL;
+
+-- 历史上并发加购可能产生的同规格重复行：数量并入 id 最小的一行，其余删除
+WITH g AS (
+    SELECT cart_id, dish_id, spec_key, min(id) AS keep_id, sum(quantity) AS total
+    FROM cart_items
+    GROUP BY cart_id, dish_id, spec_key
+    HAVING count(*) > 1
+)
+UPDATE cart_items c SET quantity = g.total FROM g WHERE c.id = g.keep_id;
+DELETE FROM cart_items c
+USING cart_items k
+WHERE c.cart_id = k.cart_id AND c.dish_id = k.dish_id AND c.spec_key = k.spec_key AND c.id > k.id;
+
+ALTER TABLE cart_items ALTER COLUMN spec_key SET NOT NULL;
+ALTER TABLE cart_items ALTER COLUMN spec_key SET DEFAULT '{}';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cart_items_cart_dish_spec ON cart_items (cart_id, dish_id, spec_key);
+-- 被唯一索引的前缀覆盖
+DROP INDEX IF EXISTS idx_cart_items_cart;
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- =========================
+-- 005 购物车版本号
+-- 每次写购物车（加购/改数量/改规格/删除/PATCH /cart）+1，随购物车视图返回
+-- =========================
+ALTER TABLE carts ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
@@ -12,8 +12,15 @@ export type CartItemOut = {
 export type CartOut = {
   items: CartItemOut[]
   total_amount: number
+  version: number
 }
 
+export type CartOp =
+  | { op: 'add'; dish_id: number; quantity: number; selected_specs?: Record<string, any> }
+  | { op: 'update'; item_id: number; quantity?: number; selected_specs?: Record<string, any> }
+  | { op: 'remove'; item_id: number }
+  | { op: 'clear' }
+
 export const getCart = () => request.get('/cart') as Promise<CartOut>
 
 export const addCartItem = (payload: { dish_id: number; quantity: number; selected_specs?: Record<string, any> }) =>
@@ -23,3 +30,7 @@ export const updateCartItem = (item_id: number, payload: { quantity?: number; se
   request.put(`/cart/items/${item_id}`, payload)
 
 export const removeCartItem = (item_id: number) => request.delete(`/cart/items/${item_id}`)
+
+/** 批量写购物车：一个事务内完成，返回新的购物车视图；version 不一致时 409 */
+export const patchCart = (ops: CartOp[], version?: number) =>
+  request.patch('/cart', { ops, version }) as Promise<CartOut>
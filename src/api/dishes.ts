@@ -14,7 +14,7 @@ export type DishListItem = {
   ai_highlights: string[]
 }
 
-export type DishListOut = { items: DishListItem[]; total: number }
+export type DishListOut = { items: DishListItem[]; total?: number | null; next_cursor?: string | null }
 
 export type DishSpecOut = {
   id: number
@@ -38,10 +38,26 @@ export type DishDetailOut = {
 }
 
 export const getCategories = () => request.get('/dishes/categories') as Promise<Category[]>
-export const getDishes = (params?: { category_id?: number; keyword?: string; status?: string }) =>
+export type DishSort = 'relevance' | 'id' | 'sales' | 'rating' | 'price'
+export const getDishes = (params?: {
+  category_id?: number
+  keyword?: string
+  status?: string
+  sort?: DishSort
+  limit?: number
+  cursor?: string
+  include_total?: boolean
+  mode?: 'bm25' | 'fuzzy'
+}) =>
   request.get('/dishes', { params }) as Promise<DishListOut>
+export type DishSuggestion = { kind: 'dish' | 'category' | string; id: number; text: string }
+export const getDishSuggestions = (prefix: string, limit = 8) =>
+  request.get('/dishes/suggest', { params: { prefix, limit } }) as Promise<DishSuggestion[]>
 export const getDishDetail = (id: number) =>
   request.get(`/dishes/${id}`) as Promise<DishDetailOut>
+export type DishBatchOut = { items: DishDetailOut[]; missing: number[] }
+export const getDishesBatch = (ids: number[]) =>
+  request.post('/dishes:batch', { ids }) as Promise<DishBatchOut>
 export async function getHomeRecommendations() {
   const res: any = await request.get('/dishes/recommend/home')
   return Array.isArray(res) ? res : (res?.items || res?.data || [])
@@ -12,6 +12,12 @@ export type OrderCreateIn = {
   items: OrderCreateItemIn[]
 }
 
+export type OrderFromCartIn = {
+  address_id: number
+  note?: string | null
+  cart_version?: number
+}
+
 export type OrderCreateOut = {
   order_id: number
   status: string
@@ -41,6 +47,9 @@ export type OrderDetailOut = {
 }
 
 export const createOrder = (payload: OrderCreateIn) => request.post('/orders', payload) as Promise<OrderCreateOut>
+/** 按服务端购物车结算：定价、写订单、清空购物车在一个事务内完成；cart_version 过期时 409 */
+export const createOrderFromCart = (payload: OrderFromCartIn) =>
+  request.post('/orders:from-cart', payload) as Promise<OrderCreateOut>
 export const listOrders = () => request.get('/orders') as Promise<OrderListOut>
 export const getOrderDetail = (id: number) => request.get(`/orders/${id}`) as Promise<OrderDetailOut>
 export const payOrder = (id: number) => request.post(`/orders/${id}/pay`)
@@ -1,5 +1,6 @@
 import { defineStore } from 'pinia'
 import request from '@/utils/request'
+import { patchCart, type CartOp } from '@/api/cart'
 
 export type CartItemVM = {
   id: number
@@ -15,6 +16,7 @@ export const useCartStore = defineStore('cart', {
   state: () => ({
     items: [] as CartItemVM[],
     totalAmount: 0,
+    version: 0,
     loaded: false,
     loading: false,
   }),
@@ -25,21 +27,26 @@ export const useCartStore = defineStore('cart', {
   },
 
   actions: {
+    applyView(res: any) {
+      this.items = (res.items || []).map((it: any) => ({
+        id: Number(it.id),
+        dish_id: Number(it.dish_id),
+        name: it.dish_name || it.name || `Dish #${it.dish_id}`,
+        image_url: it.dish_image_url || it.image_url || null,
+        quantity: Number(it.quantity ?? 1),
+        unit_price: Number(it.unit_price ?? 0),
+        spec_snapshot: it.spec_snapshot || it.spec || {},
+      }))
+      this.totalAmount = Number(res.total_amount ?? 0) // ✅ total_amount
+      this.version = Number(res.version ?? 0)
+      this.loaded = true
+    },
+
     async refresh() {
       this.loading = true
       try {
         const res = (await request.get('/cart')) as any // ✅ GET /api/cart
-        this.items = (res.items || []).map((it: any) => ({
-          id: Number(it.id),
-          dish_id: Number(it.dish_id),
-          name: it.dish_name || it.name || `Dish #${it.dish_id}`,
-          image_url: it.dish_image_url || it.image_url || null,
-          quantity: Number(it.quantity ?? 1),
-          unit_price: Number(it.unit_price ?? 0),
-          spec_snapshot: it.spec_snapshot || it.spec || {},
-        }))
-        this.totalAmount = Number(res.total_amount ?? 0) // ✅ total_amount
-        this.loaded = true
+        this.applyView(res)
         return res
       } finally {
         this.loading = false
@@ -55,19 +62,29 @@ export const useCartStore = defineStore('cart', {
       await this.refresh()
     },
 
+    /** PATCH /api/cart：多步操作一次提交，响应即最新购物车，无需再 refresh */
+    async patch(ops: CartOp[]) {
+      const res = await patchCart(ops)
+      this.applyView(res)
+      return res
+    },
+
     async updateItem(itemId: number, payload: { quantity?: number; spec_snapshot?: any }) {
-      await request.put(`/cart/items/${itemId}`, payload)
-      await this.refresh()
+      await this.patch([{ op: 'update', item_id: itemId, quantity: payload.quantity, selected_specs: payload.spec_snapshot }])
     },
 
     async removeItem(itemId: number) {
-      await request.delete(`/cart/items/${itemId}`)
-      await this.refresh()
+      await this.patch([{ op: 'remove', item_id: itemId }])
+    },
+
+    async clear() {
+      await this.patch([{ op: 'clear' }])
     },
 
     clearLocal() {
       this.items = []
       this.totalAmount = 0
+      this.version = 0
       this.loaded = false
     },
   },